@@ -1,8 +1,47 @@
 from typing import Optional
 
-from common.tokenize import tokenize_text
+import contractions
+import numpy as np
+from spacy.tokens.doc import Doc
+
+from common.tokenize import UNUSED_PIPES, tokenize_text
 from database.rdf.triple import Triple
-from database.redis.redis import get_redis_db
+from database.redis.redis import decode_source, get_redis_db, source_key
+
+
+def sentence_index(doc: Doc) -> Optional[bytes]:
+    """Serialize the doc's sentence bounds for storage at `source:{id}:sents`.
+
+    Rows are (first token index, start char, end char) per sentence, as int32. Char
+    offsets index the contraction-fixed text that the doc (and token locs) came from.
+    Returns None if the doc has no sentence boundaries.
+    """
+
+    if not doc.has_annotation("SENT_START"):
+        return None
+
+    bounds = [(s.start, s.start_char, s.end_char) for s in doc.sents]
+    return np.asarray(bounds, dtype=np.int32).T.tobytes()
+
+
+def _text_from_sentence_index(
+    source: str,
+    index: bytes,
+    start_index: int,
+    end_index: int,
+    sentences_before: int,
+    sentences_after: int,
+) -> str:
+    """`get_source_text` using stored sentence bounds instead of re-parsing the source."""
+
+    starts, start_chars, end_chars = np.frombuffer(index, dtype=np.int32).reshape(3, -1)
+
+    first = int(np.searchsorted(starts, start_index, side="right")) - 1
+    last = int(np.searchsorted(starts, end_index, side="right")) - 1
+    first = max(0, first - sentences_before)
+    last = min(len(starts) - 1, last + sentences_after)
+
+    return contractions.fix(source)[start_chars[first] : end_chars[last]]
 
 
 def get_source_text(
@@ -12,13 +51,22 @@ def get_source_text(
 
     source: Optional[str] = None
 
-    with get_redis_db() as db:
-        source = db.get("source:" + source_id)
+    # Raw bytes, since long sources are stored compressed
+    with get_redis_db(decode_responses=False) as db:
+        key = source_key(source_id)
+        raw, index = db.mget(key, f"{key}:sents")
+        source = decode_source(raw)
 
     if source is None:
         return None
 
-    doc = tokenize_text(source)
+    if index is not None:
+        return _text_from_sentence_index(
+            source, index, start_index, end_index, sentences_before, sentences_after
+        )
+
+    # Sources saved without a sentence index are re-parsed; only sentence boundaries are needed
+    doc = tokenize_text(source, disable=UNUSED_PIPES)
 
     start_sent = doc[start_index].sent
     end_sent = doc[end_index].sent
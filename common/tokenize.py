@@ -1,6 +1,14 @@
+import hashlib
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from typing import Any, Optional
+
 import contractions
 import spacy
+from spacy.language import Language
 from spacy.tokens.doc import Doc
+from spacy.tokens.span import Span
 from spacy.tokens.token import Token
 
 
@@ -32,14 +40,50 @@ def _load_nlp():
     return spacy.blank("en")
 
 
-# Load the spaCy model once at import time and reuse it.
-_NLP = _load_nlp()
+# The spaCy model is loaded on first use, once per process, and then shared.
+_NLP: Optional[Language] = None
+_NLP_LOCK = threading.Lock()
+
+
+def _get_nlp() -> Language:
+    """Return the shared pipeline, loading it on first call; safe to call from any thread."""
+
+    global _NLP
+    if _NLP is None:
+        with _NLP_LOCK:
+            if _NLP is None:
+                _NLP = _load_nlp()
+
+    return _NLP
+
+
+# Pipeline components that triple extraction and sentence lookup never read. The
+# parser and tagger (dependency labels, POS, lemmas, noun chunks) are required;
+# these are not. Retrieval keeps them, since it uses `doc.ents` for mentions.
+UNUSED_PIPES = ("ner", "textcat", "scispacy_linker")
+
+# Texts per `nlp.pipe` batch when tokenizing many texts at once
+DEFAULT_BATCH_SIZE = int(os.environ.get("BETTERAI_SPACY_BATCH_SIZE", "64"))
+
 
+def tokenize_text(
+    text: str | Iterable[str],
+    enable_bert: bool = False,
+    batch_size: Optional[int] = None,
+    n_process: int = 1,
+    disable: Iterable[str] = (),
+    as_tuples: bool = False,
+) -> Doc | Iterator[Doc] | Iterator[tuple[Doc, Any]]:
+    """Given input text, return tokenized version used for processing.
 
-def tokenize_text(text: str, enable_bert: bool = False) -> Doc:
-    """Given input text, return tokenized version used for processing."""
+    Given an iterable of texts instead, return a generator of Docs parsed in
+    batches with `nlp.pipe` (`batch_size` defaults to BETTERAI_SPACY_BATCH_SIZE).
+    With `as_tuples`, the iterable holds (text, context) pairs and (Doc, context)
+    pairs are yielded, so ids can travel with each text as it streams through.
+    Components named in `disable` (e.g. UNUSED_PIPES) are skipped for this call.
+    """
 
-    nlp = _NLP
+    nlp = _get_nlp()
 
     if enable_bert:
         # Best-effort transformer setup; safe to skip if unavailable
@@ -53,17 +97,111 @@ def tokenize_text(text: str, enable_bert: bool = False) -> Doc:
             # If transformers or the specific model isn't available, fall back gracefully.
             pass
 
-    text = contractions.fix(text)
-
     # nlp.add_pipe("experimental_coref")
     # nlp.initialize()
 
-    doc = nlp(text)
+    # Per-call disabling leaves the shared pipeline untouched for other callers
+    disable = [name for name in disable if name in nlp.pipe_names]
+
+    if isinstance(text, str):
+        return annotate_noun_chunks(_parse_cached(nlp, contractions.fix(text), disable))
+
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    if as_tuples:
+        return _tokenize_many_tuples(nlp, text, batch_size, n_process, disable)
+
+    return _tokenize_many(nlp, text, batch_size, n_process, disable)
+
+
+# Recently parsed texts, held as `Doc.to_bytes()` so the cache stores compact bytes
+# rather than live Docs. Keys include the model and active pipes, so a different model
+# or component set never reuses a stale parse.
+_DOC_CACHE: dict[tuple, bytes] = {}
+_DOC_CACHE_MAX = 256
+
+
+def _parse_cached(nlp: Language, text: str, disable: list[str]) -> Doc:
+    """Parse `text`, reusing a cached parse of identical text when there is one."""
 
-    # Add custom attribute "noun_chunk" to tokens
-    Token.set_extension("noun_chunk", default=None, force=True)
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    key = (
+        digest,
+        nlp.meta.get("name"),
+        nlp.meta.get("version"),
+        tuple(nlp.pipe_names),
+        tuple(disable),
+    )
 
-    for noun in doc.noun_chunks:
-        noun.root._.noun_chunk = noun
+    data = _DOC_CACHE.pop(key, None)
+    if data is not None:
+        _DOC_CACHE[key] = data
+        return Doc(nlp.vocab).from_bytes(data)
+
+    doc = nlp(text, disable=disable)
+    try:
+        data = doc.to_bytes()
+    except Exception:
+        # Some components store extension values msgpack can't serialize; don't cache those
+        return doc
+
+    _DOC_CACHE[key] = data
+    if len(_DOC_CACHE) > _DOC_CACHE_MAX:
+        # Hits are re-inserted, so the first key is the least recently used
+        del _DOC_CACHE[next(iter(_DOC_CACHE))]
 
     return doc
+
+
+def _tokenize_many(
+    nlp: Language, texts: Iterable[str], batch_size: int, n_process: int, disable: list[str]
+) -> Iterator[Doc]:
+    fixed = (contractions.fix(text) for text in texts)
+    docs = nlp.pipe(fixed, batch_size=batch_size, n_process=n_process, disable=disable)
+    try:
+        for doc in docs:
+            yield annotate_noun_chunks(doc)
+    finally:
+        # Stops spaCy's worker processes now, even if a doc failed or the caller stopped
+        # early; otherwise they wait for more input until the generator is collected
+        docs.close()
+
+
+def _tokenize_many_tuples(
+    nlp: Language,
+    items: Iterable[tuple[str, Any]],
+    batch_size: int,
+    n_process: int,
+    disable: list[str],
+) -> Iterator[tuple[Doc, Any]]:
+    fixed = ((contractions.fix(text), context) for text, context in items)
+    docs = nlp.pipe(
+        fixed, as_tuples=True, batch_size=batch_size, n_process=n_process, disable=disable
+    )
+    try:
+        for doc, context in docs:
+            yield annotate_noun_chunks(doc), context
+    finally:
+        docs.close()
+
+
+def annotate_noun_chunks(doc: Doc) -> Doc:
+    """Index noun chunks by root token so `token._.noun_chunk` is a dict lookup."""
+
+    doc._.noun_chunk_map = {noun.root.i: noun for noun in doc.noun_chunks}
+
+    return doc
+
+
+def _get_noun_chunk(token: Token) -> Optional[Span]:
+    """Return the noun chunk rooted at `token`, building the doc's index on first access."""
+
+    chunks = token.doc._.noun_chunk_map
+    if chunks is None:
+        chunks = annotate_noun_chunks(token.doc)._.noun_chunk_map
+
+    return chunks.get(token.i)
+
+
+# Add custom attribute "noun_chunk" to tokens, backed by a per-doc index
+Doc.set_extension("noun_chunk_map", default=None, force=True)
+Token.set_extension("noun_chunk", getter=_get_noun_chunk, force=True)
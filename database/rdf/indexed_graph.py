@@ -0,0 +1,207 @@
+from collections.abc import Iterator
+from itertools import count
+from typing import Optional
+
+from rdflib import Graph, URIRef
+from rdflib.store import Store
+
+Index = dict[int, dict[int, set[int]]]
+
+# Shared across stores, so a version number identifies one store in one state
+_VERSIONS = count(1)
+
+
+def _index_add(index: Index, a, b, c) -> bool:
+    """Insert c under index[a][b]; return False if it was already there."""
+
+    inner = index.get(a)
+    if inner is None:
+        inner = index[a] = {}
+    leaf = inner.get(b)
+    if leaf is None:
+        leaf = inner[b] = set()
+    elif c in leaf:
+        return False
+    leaf.add(c)
+    return True
+
+
+def _index_discard(index: Index, a, b, c):
+    inner = index[a]
+    leaf = inner[b]
+    leaf.discard(c)
+    if not leaf:
+        del inner[b]
+        if not inner:
+            del index[a]
+
+
+class TermDict:
+    """Dictionary encoding of RDF terms as dense integer ids.
+
+    Index probes then hash and compare small ints; `Literal.__hash__` and `__eq__` are
+    Python-level and several times slower than an int's. Ids are never reused, so a
+    term keeps its id after its last triple is removed.
+    """
+
+    def __init__(self):
+        self.ids: dict[object, int] = {}
+        self.terms: list = []
+
+    def intern(self, term) -> int:
+        """Id for `term`, assigning the next free one on first sight."""
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def lookup(self, term) -> Optional[int]:
+        """Id for `term`, or None if it has never been interned."""
+        return self.ids.get(term)
+
+    def resolve(self, term_id: int):
+        return self.terms[term_id]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+class IndexedStore(Store):
+    """In-memory triple store keyed by subject, object and predicate.
+
+    Triples live in three dict-of-dict-of-set indices, `spo[s][p]`, `ops[o][p]` and
+    `pso[p][s]`, so a pattern with any bound term is answered by hash lookups rather
+    than a scan. Terms are stored as `TermDict` ids and converted back at the API
+    boundary. Contexts are not supported; everything lives in the default graph.
+    """
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration)
+        self.identifier = identifier
+        self.terms = TermDict()
+        self.spo: Index = {}
+        self.ops: Index = {}
+        self.pso: Index = {}
+        self.predicate_count: dict[int, int] = {}
+        """Number of triples per predicate id, kept current on add/remove."""
+        self.size = 0
+        self.version = next(_VERSIONS)
+        """Changes on every add/remove that alters the store; never reused."""
+        self._namespace: dict[str, URIRef] = {}
+        self._prefix: dict[URIRef, str] = {}
+
+    def add(self, triple, context=None, quoted=False):
+        intern = self.terms.intern
+        s, p, o = intern(triple[0]), intern(triple[1]), intern(triple[2])
+        if not _index_add(self.spo, s, p, o):
+            return
+        _index_add(self.ops, o, p, s)
+        _index_add(self.pso, p, s, o)
+        self.predicate_count[p] = self.predicate_count.get(p, 0) + 1
+        self.size += 1
+        self.version = next(_VERSIONS)
+
+    def remove(self, triple_pattern, context=None):
+        pattern = self._pattern_ids(triple_pattern)
+        matches = list(self._match(*pattern)) if pattern is not None else []
+        if matches:
+            self.version = next(_VERSIONS)
+        for s, p, o in matches:
+            _index_discard(self.spo, s, p, o)
+            _index_discard(self.ops, o, p, s)
+            _index_discard(self.pso, p, s, o)
+            self.predicate_count[p] -= 1
+            if not self.predicate_count[p]:
+                del self.predicate_count[p]
+            self.size -= 1
+
+    def triples(self, triple_pattern, context=None):
+        pattern = self._pattern_ids(triple_pattern)
+        if pattern is None:
+            return
+        terms = self.terms.terms
+        for s, p, o in self._match(*pattern):
+            yield (terms[s], terms[p], terms[o]), iter(())
+
+    def _pattern_ids(self, triple_pattern) -> Optional[tuple]:
+        """Pattern with bound terms as ids (None stays a wildcard); None if a term is unknown."""
+        ids = []
+        for term in triple_pattern:
+            if term is not None:
+                term = self.terms.lookup(term)
+                if term is None:
+                    return None
+            ids.append(term)
+        return tuple(ids)
+
+    def _match(self, s, p, o) -> Iterator[tuple]:
+        if s is not None:
+            by_pred = self.spo.get(s)
+            if by_pred is None:
+                return
+            preds = (p,) if p is not None else tuple(by_pred)
+            for pred in preds:
+                objs = by_pred.get(pred, ())
+                if o is not None:
+                    if o in objs:
+                        yield s, pred, o
+                else:
+                    for obj in tuple(objs):
+                        yield s, pred, obj
+        elif o is not None:
+            by_pred = self.ops.get(o)
+            if by_pred is None:
+                return
+            preds = (p,) if p is not None else tuple(by_pred)
+            for pred in preds:
+                for subj in tuple(by_pred.get(pred, ())):
+                    yield subj, pred, o
+        else:
+            preds = (p,) if p is not None else tuple(self.pso)
+            for pred in preds:
+                for subj, objs in tuple(self.pso.get(pred, {}).items()):
+                    for obj in tuple(objs):
+                        yield subj, pred, obj
+
+    def __len__(self, context=None) -> int:
+        return self.size
+
+    def bind(self, prefix, namespace, override=True):
+        bound_namespace = self._namespace.get(prefix)
+        bound_prefix = self._prefix.get(namespace)
+        if bound_prefix is None and bound_namespace is not None:
+            bound_prefix = self._prefix.get(bound_namespace)
+        if override:
+            if bound_prefix is not None:
+                del self._namespace[bound_prefix]
+            if bound_namespace is not None:
+                del self._prefix[bound_namespace]
+            self._prefix[namespace] = prefix
+            self._namespace[prefix] = namespace
+        else:
+            namespace = bound_namespace if bound_namespace is not None else namespace
+            prefix = bound_prefix if bound_prefix is not None else prefix
+            self._prefix[namespace] = prefix
+            self._namespace[prefix] = namespace
+
+    def namespace(self, prefix) -> Optional[URIRef]:
+        return self._namespace.get(prefix)
+
+    def prefix(self, namespace) -> Optional[str]:
+        return self._prefix.get(namespace)
+
+    def namespaces(self):
+        yield from self._namespace.items()
+
+
+class IndexedGraph(Graph):
+    """rdflib Graph backed by an `IndexedStore`; SPARQL `query` evaluates against its indices."""
+
+    def __init__(self, identifier=None):
+        super().__init__(store=IndexedStore(), identifier=identifier)
+
+    @property
+    def version(self) -> int:
+        """Store version; equal values mean the same graph with the same triples."""
+        return self.store.version
@@ -5,6 +5,7 @@ from typing import Optional
 from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import RDFS
 
+from .indexed_graph import IndexedGraph
 from .triple import Triple
 from .tripleset import TripleSet
 
@@ -19,11 +20,13 @@ class RDFDatabase:
         if not cls.instance:
             cls.instance = super().__new__(cls)
 
-            graph = Graph()
+            # Indexed store: SPARQL uses its indices and retrieval caches key on its version
+            graph = IndexedGraph()
             # Attempt to load an existing graph if available
             if os.path.exists("./graph.json"):
                 try:
-                    graph.parse("./graph.json", format="json-ld")
+                    # The JSON-LD parser needs a context-aware store, so load via a plain Graph
+                    graph += Graph().parse("./graph.json", format="json-ld")
                 except Exception:
                     # Ignore load failures; start with an empty graph
                     pass
@@ -48,6 +51,10 @@ class RDFDatabase:
         if not payload:
             return
 
+        # Collect quads and add them in one call rather than one graph.add per triple
+        graph = self.graph
+        quads = []
+
         for item in payload:
             if not isinstance(item, Triple):
                 continue
@@ -62,14 +69,16 @@ class RDFDatabase:
             p = p_raw.to_rdf()
             o = o_raw.to_rdf()
 
-            self.graph.add((s, p, o))
+            quads.append((s, p, o, graph))
             # Expose subject as an rdfs:label for label-based binding in retrieval
             try:
-                self.graph.add((s, RDFS.label, Literal(str(s_raw))))
-                self.graph.add((o, RDFS.label, Literal(str(o_raw))))
+                quads.append((s, RDFS.label, Literal(str(s_raw)), graph))
+                quads.append((o, RDFS.label, Literal(str(o_raw)), graph))
             except Exception:
                 pass
 
+        graph.addN(quads)
+
         # Best-effort persist; ignore failures in restricted environments
         try:
             self.graph.serialize(destination="./graph.json", format="json-ld")
@@ -86,6 +95,9 @@ class RDFDatabase:
         if not payload:
             return
 
+        graph = self.graph
+        quads = []
+
         NS = Namespace("http://example.org/node/")
         REL = Namespace("http://example.org/rel/")
 
@@ -111,14 +123,16 @@ class RDFDatabase:
             # Store object as literal for simplicity
             o = Literal(str(o_raw))
 
-            self.graph.add((s, p, o))
+            quads.append((s, p, o, graph))
             # Also add a best-effort rdfs:label for the subject to enable label binding
             try:
                 if label_raw:
-                    self.graph.add((s, RDFS.label, Literal(str(label_raw))))
+                    quads.append((s, RDFS.label, Literal(str(label_raw)), graph))
             except Exception:
                 pass
 
+        graph.addN(quads)
+
         # Best-effort persist; ignore failures in restricted environments
         try:
             self.graph.serialize(destination="./graph.json", format="json-ld")
@@ -1,4 +1,4 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from typing import Optional, TypeVar
 
 import attrs
@@ -10,11 +10,24 @@ from .triple import Node, Pred, Slot, SlotLike, SlotLoc, Triple
 T = TypeVar("T")
 
 
+def _index_key(value) -> Optional[str | int]:
+    """Index key for a slot value; reified triples (unhashable) are not indexed."""
+
+    return value if isinstance(value, (str, int)) else None
+
+
 @attrs.define
 class TripleSet:
     triples: list[Triple]
     nodes: dict[str, Node] = {}
 
+    # Positions of triples in `triples`, keyed by subject, predicate and object value.
+    # Built lazily and extended on query, so appending to `triples` directly stays safe.
+    _index: tuple[dict, dict, dict] = attrs.field(
+        init=False, repr=False, eq=False, factory=lambda: ({}, {}, {})
+    )
+    _indexed: int = attrs.field(init=False, repr=False, eq=False, default=0)
+
     def __str__(self):
         return f"[{', '.join([triple.__str__() for triple in self.triples])}]"
 
@@ -56,6 +69,47 @@ class TripleSet:
 
         return wrapper
 
+    def _sync_index(self):
+        """Index any triples appended since the last query."""
+
+        triples = self.triples
+        if self._indexed > len(triples):
+            # The list was replaced; start over
+            self._index = ({}, {}, {})
+            self._indexed = 0
+
+        for i in range(self._indexed, len(triples)):
+            for index, slot in zip(self._index, triples[i].as_tuple(), strict=True):
+                key = _index_key(getattr(slot, "value", slot))
+                if key is not None:
+                    index.setdefault(key, []).append(i)
+
+        self._indexed = len(triples)
+
+    def _candidates(self, query: tuple[Optional[Slot], ...]) -> Iterable[Triple]:
+        """Triples that may match `query`, in insertion order.
+
+        Uses the shortest position list among the bound slots; callers still compare
+        each candidate against the full query.
+        """
+
+        self._sync_index()
+
+        best: Optional[list[int]] = None
+        for index, slot in zip(self._index, query, strict=True):
+            key = _index_key(slot.value) if slot is not None else None
+            if key is None:
+                continue
+            positions = index.get(key, [])
+            if best is None or len(positions) < len(best):
+                best = positions
+
+        if best is None:
+            return self.triples
+
+        triples = self.triples
+        return (triples[i] for i in best)
+
     def _get_root_subject(self, subject: Slot) -> Slot:
         """Get the root triple for a subject."""
 
@@ -99,9 +153,8 @@ class TripleSet:
         if get_root is True and subject is not None:
             subject = self._get_root_subject(subject)
 
-        return next(
-            (triple for triple in self.triples if triple == (subject, predicate, object)), None
-        )
+        query = (subject, predicate, object)
+        return next((triple for triple in self._candidates(query) if triple == query), None)
 
     @_slot_query
     def filter(
@@ -110,17 +163,13 @@ class TripleSet:
         predicate: Optional[Slot] = None,
         object: Optional[Slot] = None,
         get_root=False,
-    ) -> "TripleSet":
-        """Return new TripleSet with triples that match query."""
+    ) -> "TripleSetView":
+        """Return a live, read-only view of the triples that match query (see TripleSetView)."""
 
         if get_root is True:
             subject = self._get_root_subject(subject)
 
-        filtered_triples = [
-            triple for triple in self.triples if triple == (subject, predicate, object)
-        ]
-
-        return TripleSet(filtered_triples)
+        return TripleSetView(self, (subject, predicate, object))
 
     def count(self):
         """Get number of triples in tripleset."""
@@ -149,8 +198,10 @@ class TripleSet:
         loc: Optional[SlotLoc] = None
 
         # Replace with noun chunk if needed
-        if isinstance(text, Token) and text._.noun_chunk is not None:
-            text = text._.noun_chunk
+        if isinstance(text, Token):
+            noun_chunk = text._.noun_chunk
+            if noun_chunk is not None:
+                text = noun_chunk
 
         # Get final text, start, and end
         if isinstance(text, Token):
@@ -234,3 +285,81 @@ class TripleSet:
     #     """Create new triple and add to TripleSet."""
 
     #     return self.get_or_create(subject, predicate, object, get_root=get_root, loc=loc)
+
+
+class TripleSetView:
+    """Read-only result of `TripleSet.filter`.
+
+    Holds the parent and the query; matching triples are looked up through the
+    parent's index when first needed, and again whenever the parent has grown, so
+    the view also sees triples appended after `filter()` was called. Supports the
+    same query methods as TripleSet, so filters and lookups can be chained, but not
+    `nodes`, `create_triple` or `get_or_create_node`; build through the TripleSet.
+    """
+
+    def __init__(self, parent: "TripleSet | TripleSetView", query: tuple[Optional[Slot], ...]):
+        self._parent = parent
+        self._query = query
+        self._matches: Optional[list[Triple]] = None
+        # Parent size the matches were computed at; triples are only ever appended
+        self._seen = -1
+
+    @property
+    def triples(self) -> list[Triple]:
+        size = self._parent.count()
+        if self._matches is None or size != self._seen:
+            query = self._query
+            self._matches = [t for t in self._parent._candidates(query) if t == query]
+            self._seen = size
+        return self._matches
+
+    def __str__(self):
+        return f"[{', '.join([triple.__str__() for triple in self.triples])}]"
+
+    def __iter__(self):
+        return iter(self.triples)
+
+    def _candidates(self, query: tuple[Optional[Slot], ...]) -> Iterable[Triple]:
+        return self.triples
+
+    _get_root_subject = TripleSet._get_root_subject
+
+    @TripleSet._slot_query
+    def get_or_none(
+        self,
+        subject: Optional[Slot] = None,
+        predicate: Optional[Slot] = None,
+        object: Optional[Slot] = None,
+        get_root=False,
+    ) -> Triple | None:
+        """Find first matching triple in the view or none."""
+
+        assert (
+            subject is not None or predicate is not None or object is not None
+        ), "Must provide a subject, predicate, and/or object"
+
+        if get_root is True and subject is not None:
+            subject = self._get_root_subject(subject)
+
+        query = (subject, predicate, object)
+        return next((triple for triple in self.triples if triple == query), None)
+
+    @TripleSet._slot_query
+    def filter(
+        self,
+        subject: Optional[Slot] = None,
+        predicate: Optional[Slot] = None,
+        object: Optional[Slot] = None,
+        get_root=False,
+    ) -> "TripleSetView":
+        """Narrow the view further."""
+
+        if get_root is True:
+            subject = self._get_root_subject(subject)
+
+        return TripleSetView(self, (subject, predicate, object))
+
+    def count(self):
+        """Get number of triples in view."""
+
+        return len(self.triples)
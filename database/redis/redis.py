@@ -1,9 +1,18 @@
+import zlib
 from collections.abc import Generator
 from contextlib import contextmanager
+from typing import Optional
 
 import redis
 
 DEFAULT_REDIS_DB = 0
+# Prepended to every key the app writes; tests set a per-test prefix to scope cleanup
+KEY_PREFIX = ""
+
+# Source texts at least this many bytes are stored zlib-compressed behind a magic
+# prefix; shorter ones stay plain strings, readable by any connection.
+SOURCE_COMPRESS_MIN = 1024
+_COMPRESSED_MAGIC = b"zlib\x01"
 
 
 @contextmanager
@@ -11,10 +20,39 @@ def get_redis_db(db=None, **kwargs) -> Generator[redis.Redis]:
     """Connect to redis."""
 
     db = db or DEFAULT_REDIS_DB
+    kwargs.setdefault("decode_responses", True)
 
-    conn = redis.Redis(host="localhost", port=6379, db=db, decode_responses=True, **kwargs)
+    conn = redis.Redis(host="localhost", port=6379, db=db, **kwargs)
     conn.ping()
 
     yield conn
 
     conn.close()
+
+
+def source_key(source_id: str) -> str:
+    """Key holding a source's text; its sentence index lives at `{key}:sents`."""
+
+    return f"{KEY_PREFIX}source:{source_id}"
+
+
+def encode_source(text: str) -> str | bytes:
+    """Value to store for a source text: compressed if long, otherwise the text itself."""
+
+    data = text.encode("utf-8")
+    # Short text that happens to start with the magic is compressed too, so reads stay unambiguous
+    if len(data) < SOURCE_COMPRESS_MIN and not data.startswith(_COMPRESSED_MAGIC):
+        return text
+
+    return _COMPRESSED_MAGIC + zlib.compress(data)
+
+
+def decode_source(raw: Optional[bytes]) -> Optional[str]:
+    """Inverse of `encode_source`, for a value read with `decode_responses=False`."""
+
+    if raw is None:
+        return None
+    if raw.startswith(_COMPRESSED_MAGIC):
+        return zlib.decompress(raw[len(_COMPRESSED_MAGIC) :]).decode("utf-8")
+
+    return raw.decode("utf-8")
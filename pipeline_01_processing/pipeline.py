@@ -2,11 +2,19 @@
 Data Processing Pipline Entrypoint
 """
 
+import queue
+import threading
 import uuid
+from collections.abc import Callable, Iterable, Iterator
+from typing import Optional
 
-from common.tokenize import tokenize_text
+import redis
+from spacy.tokens.doc import Doc
+
+from common.get_source import sentence_index
+from common.tokenize import DEFAULT_BATCH_SIZE, UNUSED_PIPES, tokenize_text
 from database.rdf.tripleset import TripleSet
-from database.redis.redis import get_redis_db
+from database.redis.redis import encode_source, get_redis_db, source_key
 
 from .tokens_to_rdf import tokens_to_rdf
 
@@ -29,15 +37,163 @@ def run_pipeline(text: str) -> tuple[TripleSet, str]:
     """
 
     # Step 1: Convert text to tokens using NER, POS, etc
-    tokens = tokenize_text(text)
+    tokens = tokenize_text(text, disable=UNUSED_PIPES)
 
     source_id = uuid.uuid4().__str__()
 
     # Step 1.5: Save text to database
     with get_redis_db() as db:
-        db.set(f"source:{source_id}", text)
+        save_source(db, source_id, text, doc=tokens)
 
     # Step 2: Convert tokens to RDF graph form
     graph = tokens_to_rdf(tokens, source_id=source_id)
 
     return (graph, source_id)
+
+
+def run_pipeline_batch(
+    texts: Iterable[str], batch_size: Optional[int] = None, n_process: int = 1
+) -> Iterator[tuple[TripleSet, str]]:
+    """
+    Run the processing pipeline over many texts, overlapping its stages.
+
+    Parsing and RDF conversion run in their own threads and hand off through bounded
+    queues to the Redis writes on the caller's thread, so a batch's round trip is
+    hidden behind the next documents' parse. A stage that gets ahead blocks rather
+    than buffering the corpus.
+    A one-element list yields the same triples as `run_pipeline`; like there, every
+    text gets a fresh random source id.
+
+    Parameters
+    ----------
+    texts (Iterable[str]) : Texts to process; consumed lazily, so a generator works.
+    batch_size (int | None) : Texts per spaCy batch and per Redis round trip; defaults
+        to BETTERAI_SPACY_BATCH_SIZE.
+    n_process (int) : spaCy worker processes. Defaults to 1, which keeps everything
+        in-process and debuggable; use -1 for one per CPU on large corpora.
+
+    Returns
+    -------
+    Iterator of (TripleSet, source id) pairs, in input order.
+    """
+
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    parsed: queue.Queue = queue.Queue(maxsize=2 * _STAGE_WORKERS)
+    built: queue.Queue = queue.Queue(maxsize=2 * _STAGE_WORKERS)
+    stop = threading.Event()
+
+    # Stage 1: spaCy parse (the parser releases the GIL for much of its work). Each text
+    # and its source id ride along as the parse context, so the input is streamed and
+    # never held in full; the original text is still needed for saving.
+    def parse() -> Iterator[tuple[Doc, tuple[str, str]]]:
+        items = ((text, (uuid.uuid4().__str__(), text)) for text in texts)
+        return tokenize_text(
+            items, batch_size=batch_size, n_process=n_process, disable=UNUSED_PIPES, as_tuples=True
+        )
+
+    # Stage 2: Docs to triples
+    def build() -> Iterator[tuple[str, str, Doc, TripleSet]]:
+        for tokens, (source_id, text) in _drain(parsed, stop):
+            yield (source_id, text, tokens, tokens_to_rdf(tokens, source_id=source_id))
+
+    # Plain threads rather than a ThreadPoolExecutor: spaCy forks its n_process workers
+    # from the parse thread, and a child forked from an executor thread fails at exit
+    # trying to join the executor's threads (including its own).
+    stages = [
+        threading.Thread(target=_run_stage, args=(parse, parsed, stop), name="pipeline-parse"),
+        threading.Thread(target=_run_stage, args=(build, built, stop), name="pipeline-build"),
+    ]
+    for thread in stages:
+        thread.start()
+
+    # Stage 3, on the caller's thread: sources are saved one batch per round trip
+    try:
+        with get_redis_db() as db:
+            pending: list[tuple[str, str, Doc, TripleSet]] = []
+            for item in _drain(built, stop):
+                pending.append(item)
+                if len(pending) >= batch_size:
+                    yield from _flush(db, pending)
+                    pending = []
+
+            yield from _flush(db, pending)
+    finally:
+        # Unblocks the stage threads if the caller stops early or a write fails
+        stop.set()
+        for thread in stages:
+            thread.join()
+
+
+# Threads feeding the Redis stage; each hand-off queue holds twice this many items
+_STAGE_WORKERS = 2
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+def _run_stage(stage: Callable[[], Iterable], out: queue.Queue, stop: threading.Event):
+    """Feed the items of `stage()` into `out`, then an end marker (or the stage's error)."""
+
+    try:
+        for item in stage():
+            if not _put(out, item, stop):
+                return
+    except BaseException as exc:
+        _put(out, exc, stop)
+    else:
+        _put(out, _DONE, stop)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Block until `item` is queued; False if the pipeline was stopped first."""
+
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator:
+    """Yield items from `q` until the end marker, re-raising an upstream stage's error."""
+
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def _flush(db: redis.Redis, pending: list[tuple[str, str, Doc, TripleSet]]):
+    save_sources(db, ((source_id, text, doc) for source_id, text, doc, _ in pending))
+    for source_id, _, _, graph in pending:
+        yield (graph, source_id)
+
+
+def save_sources(db: redis.Redis, items: Iterable[tuple[str, str, Optional[Doc]]]):
+    """Save (source id, text, parsed doc) triples with one pipelined round trip.
+
+    Long texts are compressed. When a doc is given, its sentence bounds are stored at
+    `source:{id}:sents` so citations can be cut out without re-parsing the text.
+    """
+
+    with db.pipeline(transaction=False) as pipe:
+        for source_id, text, doc in items:
+            key = source_key(source_id)
+            pipe.set(key, encode_source(text))
+            index = sentence_index(doc) if doc is not None else None
+            if index is not None:
+                pipe.set(f"{key}:sents", index)
+        pipe.execute()
+
+
+def save_source(db: redis.Redis, source_id: str, text: str, doc: Optional[Doc] = None):
+    """Save a single source text (and the sentence bounds of its parse, if given)."""
+
+    save_sources(db, [(source_id, text, doc)])
@@ -1,59 +1,104 @@
+import logging
+from dataclasses import dataclass, field
 from typing import Optional
 
-import attrs
+import numpy as np
+from spacy.attrs import HEAD, POS
+from spacy.symbols import NOUN, VERB, appos, attr, dobj, nsubj, nsubjpass, oprd, pobj
 from spacy.tokens.doc import Doc
 from spacy.tokens.span import Span
 from spacy.tokens.token import Token
 
-from database.rdf.triple import Node
+from database.rdf.triple import Node, Pred, SlotLoc, Triple
 from database.rdf.tripleset import TripleSet
 
+logger = logging.getLogger(__name__)
 
-@attrs.define
+
+@dataclass(slots=True)
 class TokenParser:
     """Convert tokens to different structures."""
 
-    doc: Doc = attrs.field()
-    source_id: str = attrs.field()
-    tripleset = attrs.field(init=False, factory=lambda: TripleSet([]))
-
-    def _repr_token(self, token: Token):
+    doc: Doc
+    source_id: str
+    tripleset: TripleSet = field(init=False, default_factory=lambda: TripleSet([]))
+    _seen: set[tuple[int, str, int, bool]] = field(init=False, default_factory=set, repr=False)
+    # VERB children of each NOUN token, and the last NOUN child of each such VERB (by index)
+    _noun_verbs: dict[int, list[int]] = field(init=False, default_factory=dict, repr=False)
+    _verb_noun: dict[int, int] = field(init=False, default_factory=dict, repr=False)
+
+    # Integer dependency labels, compared against `Token.dep` to skip string lookups
+    _OBJECT_DEPS = frozenset({attr, dobj, pobj, oprd})
+
+    def __post_init__(self):
+        # One array pass over the doc instead of walking children of children per span
+        arr = self.doc.to_array([POS, HEAD])
+        pos = arr[:, 0]
+        idx = np.arange(len(pos))
+        heads = idx + arr[:, 1].astype(np.int64)  # HEAD is a relative offset
+        has_head = heads != idx
+        head_pos = pos[heads]
+
+        for i in np.flatnonzero(has_head & (pos == VERB) & (head_pos == NOUN)).tolist():
+            self._noun_verbs.setdefault(int(heads[i]), []).append(i)
+        for i in np.flatnonzero(has_head & (pos == NOUN) & (head_pos == VERB)).tolist():
+            self._verb_noun[int(heads[i])] = i
+
+    def _repr_token(self, token: Token) -> str:
         return f"<{token} | pos:{token.pos_}, dep:{token.dep_}>"
 
-    def _parse_token(self, token: Token, parent: Optional[Token] = None):
+    def _parse_token(self, token: Token, parent: Optional[Token] = None) -> None:
         """Process token."""
 
         parent_node = self.tripleset.get_or_create_node(parent, self.source_id)
         token_node = self.tripleset.get_or_create_node(token, self.source_id)
-        alias_pred = self.tripleset.create_predicate("alias")
-        alias_for_pred = self.tripleset.create_predicate("alias for")
-
-        if token.dep_ == "appos" and parent is not None:
-            parent = parent._.noun_chunk or parent
 
+        if token.dep == appos and parent is not None:
             if token.text.isupper():
                 # Appositional modifier, like "HTN" for Hypertension
-                self.tripleset.create_triple(parent_node, alias_pred, token_node)
-                self.tripleset.create_triple(
-                    token_node, alias_for_pred, parent_node, get_root=False
-                )
+                alias_pred = self.tripleset.create_predicate("alias")
+                alias_for_pred = self.tripleset.create_predicate("alias for")
+
+                self._create_triple(parent_node, alias_pred, token_node)
+                self._create_triple(token_node, alias_for_pred, parent_node, get_root=False)
 
         if list(token.children):
             for child in token.children:
                 self._parse_token(child, parent=token)
 
-    def _token_to_node(self, token: Token | Span):
+    def _token_to_node(self, token: Token | Span) -> Node:
         """Create node from a token or span."""
 
         return self.tripleset.get_or_create_node(token, self.source_id)
 
-    def _get_loc(self, *token_indexes):
-        """Get location tuple from token indexes."""
-        print('getting locations for:', token_indexes)
+    def _create_triple(
+        self,
+        subject: Node,
+        predicate: Pred,
+        obj: Node,
+        get_root: bool = True,
+        loc: Optional[SlotLoc] = None,
+    ) -> Optional[Triple]:
+        """Create triple unless an identical one was already emitted for this doc."""
+
+        # Nodes are interned by the tripleset, so their ids are stable keys
+        key = (id(subject), str(predicate.value), id(obj), get_root)
+        if key in self._seen:
+            return None
+
+        self._seen.add(key)
 
-        return (self.source_id, min(*token_indexes), max(*token_indexes))
+        return self.tripleset.create_triple(subject, predicate, obj, get_root=get_root, loc=loc)
 
-    def _add_triple(self, subject: Token, verb: Token, obj: Token, get_root=True):
+    def _get_loc(self, i1: int, i2: int, i3: int) -> SlotLoc:
+        """Get location tuple from the subject, verb, and object token indexes."""
+        logger.debug("getting locations for: %s, %s, %s", i1, i2, i3)
+
+        return (self.source_id, min(i1, i2, i3), max(i1, i2, i3))
+
+    def _add_triple(
+        self, subject: Token, verb: Token, obj: Token, get_root: bool = True
+    ) -> Optional[Triple]:
         """Create triple and add to tripleset."""
 
         subject_n = self._token_to_node(subject)
@@ -61,54 +106,58 @@ class TokenParser:
         obj_n = self._token_to_node(obj)
         loc = self._get_loc(subject.i, verb.i, obj.i)
 
-        return self.tripleset.create_triple(subject_n, verb_n, obj_n, get_root=get_root, loc=loc)
+        return self._create_triple(subject_n, verb_n, obj_n, get_root=get_root, loc=loc)
 
     def _parse_span(
         self,
         span: Span,
-        head: Optional[Node] = None,
-    ):
+        head: Optional[Token] = None,
+    ) -> Optional[Token]:
         """Process groups of words, like sentences or sub groups."""
 
         subject: Optional[Token] = None
         verb: Token = span.root
         obj: Optional[Token] = None
 
-        for child in span.root.children:
-            if child.dep_ == "nsubj":
+        children = list(span.root.children)
+        dep_ids = {child.dep for child in children}
+
+        # Without a subject no triple can be emitted, so only look for aliases
+        if nsubj not in dep_ids and (nsubjpass not in dep_ids or head is None):
+            for child in children:
+                self._parse_token(child, parent=span.root)
+
+            return head
+
+        for child in children:
+            if child.dep == nsubj:
                 subject = child
                 head = subject
 
-            elif child.dep_ in {"attr", "dobj", "pobj", "oprd"}:
+            elif child.dep in self._OBJECT_DEPS:
                 obj = child
 
-            elif child.dep_ == "nsubjpass":
+            elif child.dep == nsubjpass:
                 subject = head
 
             self._parse_token(child, parent=span.root)
 
-            if child.pos_ == "NOUN":
-                for inner_child in child.children:
-                    if inner_child.pos_ == "VERB":
-                        sub_verb = inner_child
-                        sub_noun: Optional[Token] = None
-
-                        for inner_sub_child in sub_verb.children:
-                            if inner_sub_child.pos_ == "NOUN":
-                                sub_noun = inner_sub_child
+            if child.pos == NOUN:
+                for sub_verb in self._noun_verbs.get(child.i, ()):
+                    sub_noun = self._verb_noun.get(sub_verb)
 
-                        if sub_verb and sub_noun and subject:
-                            self._add_triple(subject, sub_verb, sub_noun)
+                    if sub_noun is not None and subject:
+                        self._add_triple(subject, self.doc[sub_verb], self.doc[sub_noun])
 
         if subject and obj and verb:
             self._add_triple(subject, verb, obj)
 
         return head
 
-    def parse_rdf_triples(self):
+    def parse_rdf_triples(self) -> None:
         """Return list of objects representing triples."""
 
-        head: Node | None = None
+        head: Optional[Token] = None
 
         # Primary iteration through each sentence - O(n)
         for sentence in self.doc.sents:
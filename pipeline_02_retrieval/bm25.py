@@ -0,0 +1,257 @@
+"""
+Inverted index for the lexical (BM25) retrieval fallback.
+
+The index is built with a single walk over the graph and cached on the database
+object, so each fallback query only touches the postings of its own terms
+instead of re-tokenizing every literal in the graph.
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Any
+
+import attr
+import numpy as np
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDFS
+
+WORD_RE = re.compile(r"[A-Za-z0-9\-]+")
+
+# Ranked results kept per index; a rebuilt index starts with an empty cache
+_TOP_CACHE_MAX = 1024
+
+
+def tokenize_words(text: str) -> list[str]:
+    """Lowercase word tokens longer than two characters."""
+    return [t.lower() for t in WORD_RE.findall(text or "") if len(t) > 2]
+
+
+@attr.s
+class BM25Index:
+    """Term postings and document statistics for BM25 scoring over graph subjects.
+
+    Subjects are addressed by dense integer ids so that scoring runs as NumPy
+    array operations over each term's postings.
+    """
+
+    subjects: list[URIRef] = attr.ib()
+    """Subject for each dense document id."""
+
+    postings: dict[str, tuple[np.ndarray, np.ndarray]] = attr.ib()
+    """Maps a term to (int32 document ids, float32 term frequencies)."""
+
+    doc_lengths: np.ndarray = attr.ib()
+    """Token count per document id (at least 1), as float32."""
+
+    avgdl: float = attr.ib()
+    """Average raw document length across all subjects."""
+
+    subj_pred_obj: dict[URIRef, tuple[str, str]] = attr.ib()
+    """Representative (predicate, literal) pair used to render each subject."""
+
+    version: Any = attr.ib(default=None)
+    """Graph state the index was built from; used to detect staleness."""
+
+    _top_cache: dict = attr.ib(factory=dict, init=False, repr=False, eq=False)
+
+    @property
+    def N(self) -> int:
+        return len(self.subjects)
+
+    def score_array(self, terms: list[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+        """BM25 score per document id for the query terms (repeats count again), as float32."""
+
+        N = self.N
+        avgdl = self.avgdl or 1.0
+        scores = np.zeros(N, dtype=np.float32)
+
+        for term in terms:
+            plist = self.postings.get(term)
+            if plist is None:
+                continue
+
+            doc_ids, freqs = plist
+            df = len(doc_ids)
+            idf = np.float32(math.log((N - df + 0.5) / (df + 0.5) + 1))
+            denom = freqs + k1 * (1 - b + b * (self.doc_lengths[doc_ids] / avgdl))
+            # A term appears at most once per document, so ids within a posting are unique
+            scores[doc_ids] += idf * ((freqs * (k1 + 1)) / denom)
+
+        return scores
+
+    def score(self, terms: list[str], k1: float = 1.5, b: float = 0.75) -> dict[URIRef, float]:
+        """Positive BM25 scores keyed by subject."""
+
+        scores = self.score_array(terms, k1=k1, b=b)
+        return {self.subjects[i]: float(scores[i]) for i in np.flatnonzero(scores > 0)}
+
+    def top(self, terms: list[str], limit: int) -> list[tuple[URIRef, float]]:
+        """The `limit` best (subject, score) pairs for the query terms, best first.
+
+        Ranking stays on the float32 score array; only the selected subjects are turned
+        into Python objects. Ties keep document id order. Results are memoized per term
+        sequence, so a repeated question costs a dict lookup.
+        """
+
+        key = (tuple(terms), limit)
+        ranked = self._top_cache.get(key)
+        if ranked is None:
+            scores = self.score_array(terms)
+            hits = np.flatnonzero(scores > 0)
+            hit_scores = scores[hits]
+            if 0 < limit < len(hits):
+                # Partition finds the limit-th best score in linear time; only hits at or
+                # above it are sorted. Ties with it are kept so the id-order tiebreak holds.
+                kth = -np.partition(-hit_scores, limit - 1)[limit - 1]
+                keep = np.flatnonzero(hit_scores >= kth)
+                hits, hit_scores = hits[keep], hit_scores[keep]
+            best = hits[np.argsort(-hit_scores, kind="stable")[:limit]]
+            ranked = [(self.subjects[i], float(scores[i])) for i in best]
+            if len(self._top_cache) >= _TOP_CACHE_MAX:
+                del self._top_cache[next(iter(self._top_cache))]
+            self._top_cache[key] = ranked
+
+        return ranked
+
+
+def _graph_version(graph: Graph):
+    # IndexedGraph counts mutations; a plain graph has no reliable change signal
+    return getattr(graph, "version", None)
+
+
+def build_bm25_index(graph: Graph) -> BM25Index:
+    """Walk the graph once and index label and literal text per subject."""
+
+    # Build simple documents per subject: label + literal fragments, tokenized in place
+    subj_docs: dict[URIRef, list[str]] = defaultdict(list)
+    subj_pred_obj: dict[URIRef, tuple[str, str]] = {}
+
+    for subj, pred, obj in graph:
+        if isinstance(obj, Literal):
+            text_frag = str(obj)
+            subj_docs[subj].append(text_frag)
+            subj_pred_obj[subj] = (str(pred), text_frag)
+            # Labels count twice
+            if pred == RDFS.label:
+                subj_docs[subj].append(text_frag)
+
+    subjects = list(subj_docs)
+    postings, raw_lengths = _index_texts(list(subj_docs.values()))
+    N = len(subjects)
+
+    return BM25Index(
+        subjects=subjects,
+        postings=postings,
+        doc_lengths=np.maximum(raw_lengths, 1).astype(np.float32),
+        avgdl=float(raw_lengths.sum()) / N if N else 0.0,
+        subj_pred_obj=subj_pred_obj,
+        version=_graph_version(graph),
+    )
+
+
+Postings = dict[str, tuple[np.ndarray, np.ndarray]]
+
+
+def _index_texts(docs: list[list[str]]) -> tuple[Postings, np.ndarray]:
+    """Tokenize every document (a list of text fragments) and return
+    (postings, raw token count per document)."""
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return _index_texts_python(docs)
+
+    return _index_texts_arrow(docs)
+
+
+def _index_texts_python(docs: list[list[str]]) -> tuple[Postings, np.ndarray]:
+    # Intern terms to integer ids so frequencies are counted by NumPy, not per-document Counters
+    vocab: dict[str, int] = {}
+    intern = vocab.setdefault
+    term_ids: list[int] = []
+    raw_lengths: list[int] = []
+
+    for frags in docs:
+        ids = [
+            intern(t.lower(), len(vocab))
+            for frag in frags
+            for t in WORD_RE.findall(frag)
+            if len(t) > 2
+        ]
+        term_ids.extend(ids)
+        raw_lengths.append(len(ids))
+
+    lengths = np.asarray(raw_lengths, dtype=np.int64)
+    doc_ids = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+
+    return (
+        _postings_from_ids(np.asarray(term_ids, dtype=np.int64), doc_ids, list(vocab), len(docs)),
+        lengths,
+    )
+
+
+def _index_texts_arrow(docs: list[list[str]]) -> tuple[Postings, np.ndarray]:
+    """Same result as `_index_texts_python`, with tokenizing done by Arrow's C++ kernels."""
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    n_docs = len(docs)
+
+    frag_lists = pa.array(docs, type=pa.list_(pa.string()))
+    frag_docs = pc.list_parent_indices(frag_lists).to_numpy().astype(np.int64)
+
+    # Splitting on runs of non-word characters yields the same tokens as WORD_RE.findall
+    split = pc.split_pattern_regex(pc.list_flatten(frag_lists), pattern=r"[^A-Za-z0-9\-]+")
+    words = pc.list_flatten(split)
+    keep = pc.greater(pc.utf8_length(words), 2)
+
+    word_frags = pc.list_parent_indices(split).filter(keep).to_numpy().astype(np.int64)
+    doc_ids = frag_docs[word_frags]
+    encoded = pc.ascii_lower(words.filter(keep)).dictionary_encode()
+    term_ids = encoded.indices.to_numpy().astype(np.int64)
+    vocab = encoded.dictionary.to_pylist()
+
+    raw_lengths = np.bincount(doc_ids, minlength=n_docs)
+    return _postings_from_ids(term_ids, doc_ids, vocab, n_docs), raw_lengths
+
+
+def _postings_from_ids(
+    term_ids: np.ndarray, doc_ids: np.ndarray, vocab: list[str], n_docs: int
+) -> Postings:
+    """Group parallel (term id, document id) arrays into per-term postings."""
+
+    if not len(term_ids):
+        return {}
+
+    # Count (term, doc) pairs; np.unique sorts by term, then by document id
+    pairs, counts = np.unique(term_ids * n_docs + doc_ids, return_counts=True)
+    pair_terms = pairs // n_docs
+    pair_docs = (pairs % n_docs).astype(np.int32)
+    freqs = counts.astype(np.float32)
+
+    bounds = np.flatnonzero(np.diff(pair_terms)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(pairs)]))
+
+    return {
+        vocab[pair_terms[start]]: (pair_docs[start:end], freqs[start:end])
+        for start, end in zip(starts, ends, strict=True)
+    }
+
+
+def get_bm25_index(db) -> BM25Index:
+    """Return the index cached on `db`, rebuilding it if the graph has changed.
+
+    Only graphs that expose a mutation `version` (`IndexedGraph`) are cached; any
+    other graph is re-indexed on every call, since its size alone cannot show that a
+    triple was swapped.
+    """
+
+    index = getattr(db, "_bm25_index", None)
+    if index is None or index.version is None or index.version != _graph_version(db.graph):
+        index = build_bm25_index(db.graph)
+        db._bm25_index = index
+
+    return index
@@ -22,19 +22,16 @@ def generate_grounded_answer(question: str, sources: Iterable[DocSource], score_
         return "Not enough evidence to answer the question based on available sources."
 
     # Filter low-score sources if scores are provided
-    filtered = []
-    for s in src_list:
-        if s.score is None or s.score >= score_threshold:
-            filtered.append(s)
+    filtered = [s for s in src_list if s.score is None or s.score >= score_threshold]
     if not filtered:
         return "Not enough high-confidence evidence to answer the question."
 
-    lines = []
-    for idx, s in enumerate(filtered, start=1):
-        citation = f"[{idx}] {s.title or s.id}"
-        content = s.content or ""
-        lines.append(f"{citation}: {content}")
+    lines = "\n".join(_format_citation(idx, s) for idx, s in enumerate(filtered, start=1))
 
     # Simple stitched answer; replace with LLM call if desired.
-    answer = f"Based on the retrieved evidence, here is a summary for: {question.strip()}\n" + "\n".join(lines)
-    return answer
+    return f"Based on the retrieved evidence, here is a summary for: {question.strip()}\n{lines}"
+
+
+def _format_citation(idx: int, source: DocSource) -> str:
+    """Render a single numbered citation line."""
+    return f"[{idx}] {source.title or source.id}: {source.content or ''}"
@@ -2,26 +2,25 @@
 Data Retrieval Pipline Entrypoint
 """
 
-import math
-import re
-from collections import Counter, defaultdict
+import asyncio
+import weakref
+from collections import OrderedDict
 from functools import lru_cache
 from typing import Optional
 
-from rdflib import Literal, URIRef
-from rdflib.namespace import RDFS
-
 from common.tokenize import tokenize_text
 from database.rdf.rdf import RDFDatabase
 
 # from pipeline_02_retrieval.patient_context import apply_patient_context
+from pipeline_02_retrieval.bm25 import get_bm25_index, tokenize_words
 from pipeline_02_retrieval.generation import generate_grounded_answer
+from pipeline_02_retrieval.query_plan import plan_query
 from pipeline_02_retrieval.schemas.doc import DocSource
 from pipeline_02_retrieval.sources import result_to_sources
 from pipeline_02_retrieval.summarize import result_to_summary
 
 from .schemas.output import Pipeline2Output
-from .tokens_to_query import tokens_to_query
+from .tokens_to_query import clear_query_cache, tokens_to_query
 
 
 def run_pipeline(db: RDFDatabase, text: str, patient_id: Optional[str] = None) -> Pipeline2Output:
@@ -40,6 +39,8 @@ def run_pipeline(db: RDFDatabase, text: str, patient_id: Optional[str] = None) -
 
     # Step 1: Convert text to list of tokens using NER, POS, etc
     tokens = tokenize_text(text=text)
+    if not tokens:
+        return _no_evidence_output(text)
 
     # Step 2: Convert tokens to a structured query for database
     query = tokens_to_query(tokens=tokens)
@@ -49,8 +50,46 @@ def run_pipeline(db: RDFDatabase, text: str, patient_id: Optional[str] = None) -
     #     query = apply_patient_context(db, query=query, patient_id=patient_id)
 
     # Step 3: Execute query against the database
+    res = _execute_query(db, query)
+
+    return _build_output(db, text, res)
+
+
+async def run_pipeline_async(
+    db: RDFDatabase, text: str, patient_id: Optional[str] = None
+) -> Pipeline2Output:
+    """
+    Async variant of `run_pipeline`.
+
+    The SPARQL query and the query embedding are independent, so they run
+    concurrently in worker threads; total latency is the slower of the two.
+    """
+
+    tokens = tokenize_text(text=text)
+    if not tokens:
+        return _no_evidence_output(text)
+    query = tokens_to_query(tokens=tokens)
+
+    res, q_emb = await asyncio.gather(
+        asyncio.to_thread(_execute_query, db, query),
+        asyncio.to_thread(_encode_query, text),
+    )
+
+    return _build_output(db, text, res, q_emb=q_emb)
+
+
+def _execute_query(db: RDFDatabase, query: str):
+    """Run SPARQL against the graph, returning None if the query is empty or fails."""
+    if not query or not query.strip():
+        return None
+
     try:
-        res = db.graph.query(query)
+        # Results are cached per graph state, which needs the mutation counter of an
+        # IndexedGraph (what RDFDatabase uses); any other graph is queried every time
+        version = getattr(db.graph, "version", None)
+        if version is not None:
+            return _cached_query(query, version, weakref.ref(db.graph))
+        return _run_query(db.graph, query)
     except Exception as e:
         # If the SPARQL query is malformed or execution fails, fall back to an empty result.
         # Log the offending query (truncated) to help with debugging.
@@ -58,22 +97,58 @@ def run_pipeline(db: RDFDatabase, text: str, patient_id: Optional[str] = None) -
         print(
             f"[Retrieval] SPARQL query failed; returning empty result. Error: {e}. Query snippet: {snippet!r}"
         )
-        res = None
+        return None
+
+
+def _run_query(graph, query: str):
+    res = graph.query(plan_query(query, graph))
+    if res.type == "SELECT":
+        # Replace rdflib's lazy row generator with a list, so a cached result can be
+        # iterated more than once
+        res.bindings = list(res.bindings)
+    return res
+
+
+@lru_cache(maxsize=1024)
+def _cached_query(query: str, version: int, graph_ref: weakref.ref):
+    """`_run_query` memoized on (query, graph version).
+
+    Versions are never reused across graphs or mutations, so a stale entry can't be
+    hit. The graph is held by weak reference to keep the cache from pinning it.
+    Failures raise and are not cached.
+    """
+    return _run_query(graph_ref(), query)
+
+
+def sources_cache_clear():
+    """Drop all cached SPARQL queries and results."""
+    clear_query_cache()
+    _cached_query.cache_clear()
+
+
+def _no_evidence_output(text: str) -> Pipeline2Output:
+    """Refusal output for input with nothing to query on."""
+    return Pipeline2Output(
+        summary="Not enough evidence to answer the question.",
+        sources=[],
+        grounded_answer=generate_grounded_answer(question=text, sources=[]),
+    )
+
+
+def _build_output(db: RDFDatabase, text: str, res, q_emb=None) -> Pipeline2Output:
+    """Turn a query result into scored sources, a summary, and a grounded answer."""
 
     # Step 4: Get text summary from query result
     summary = result_to_summary(res)
 
     # Step 5: Get document sources from query result
-    sources = result_to_sources(res)
-    sources = _score_sources(text, sources)
-    sources = _dedupe_and_sort_sources(sources)
+    sources = _finalize_sources(text, result_to_sources(res), q_emb=q_emb)
 
     # Step 5.5: If no sources found, try a lightweight lexical fallback
     if not sources:
         fallback_sources = _lexical_fallback_sources(db, text=text, limit=5)
         if fallback_sources:
-            sources = _score_sources(text, fallback_sources)
-            sources = _dedupe_and_sort_sources(sources)
+            sources = _finalize_sources(text, fallback_sources, q_emb=q_emb)
             summary = f"Used lexical fallback; found {len(sources)} source(s)."
         else:
             summary = "Not enough evidence to answer the question."
@@ -98,59 +173,19 @@ def _lexical_fallback_sources(db: RDFDatabase, text: str, limit: int = 5) -> lis
     labels and literal objects. Scores use a lightweight BM25-style weighting.
     """
 
-    tokens = [t.lower() for t in re.findall(r"[A-Za-z0-9\-]+", text or "") if len(t) > 2]
+    tokens = tokenize_words(text)
     if not tokens:
         return []
 
-    # Build simple documents per subject: concatenate label + literals
-    subj_docs: dict[URIRef, str] = defaultdict(str)
-    subj_pred_obj: dict[URIRef, tuple[str, str]] = {}
-
-    for subj, pred, obj in db.graph:
-        if isinstance(obj, Literal):
-            text_frag = str(obj)
-            subj_docs[subj] += " " + text_frag
-            subj_pred_obj[subj] = (str(pred), text_frag)
-        if pred == RDFS.label and isinstance(obj, Literal):
-            subj_docs[subj] += " " + str(obj)
+    # Score only the postings of the query terms against the cached index
+    index = get_bm25_index(db)
+    ranked = index.top(tokens, limit)
+    subj_pred_obj = index.subj_pred_obj
 
-    if not subj_docs:
-        return []
-
-    # Compute document lengths and DF for BM25-ish scoring
-    doc_tokens: dict[URIRef, list[str]] = {}
-    df: Counter[str] = Counter()
-    for subj, doc_text in subj_docs.items():
-        toks = [t.lower() for t in re.findall(r"[A-Za-z0-9\-]+", doc_text) if len(t) > 2]
-        doc_tokens[subj] = toks
-        for t in set(toks):
-            df[t] += 1
-
-    N = len(doc_tokens)
-    avgdl = sum(len(toks) for toks in doc_tokens.values()) / N if N else 0.0
-
-    def bm25(term: str, freq: int, dl: int, k1: float = 1.5, b: float = 0.75) -> float:
-        idf = math.log((N - df[term] + 0.5) / (df[term] + 0.5) + 1)
-        denom = freq + k1 * (1 - b + b * (dl / (avgdl or 1.0)))
-        return idf * ((freq * (k1 + 1)) / (denom or 1e-9))
-
-    scores: dict[URIRef, float] = {}
-    for subj, toks in doc_tokens.items():
-        dl = len(toks) or 1
-        tf = Counter(toks)
-        score = 0.0
-        for term in tokens:
-            if term not in tf:
-                continue
-            score += bm25(term, tf[term], dl)
-        if score > 0:
-            scores[subj] = score
-
-    if not scores:
+    if not ranked:
         return []
 
     # Build DocSource objects sorted by score desc
-    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
     docs: list[DocSource] = []
     for subj, score in ranked:
         pred_str, obj_text = subj_pred_obj.get(subj, ("", ""))
@@ -167,37 +202,42 @@ def _lexical_fallback_sources(db: RDFDatabase, text: str, limit: int = 5) -> lis
     return docs
 
 
-def _dedupe_and_sort_sources(sources: list[DocSource]) -> list[DocSource]:
-    """Deduplicate sources by id/title/content/type, keeping the highest score and sorting by score."""
+def _source_tokens(source: DocSource) -> set[str]:
+    """Token set of a source's title and content, computed once per source."""
+    if source._tokens is None:
+        source._tokens = set(tokenize_words(f"{source.title} {source.content}"))
+    return source._tokens
+
+
+def _finalize_sources(query: str, sources: list[DocSource], q_emb=None) -> list[DocSource]:
+    """Score, deduplicate, and rank sources, best first.
+
+    Unscored sources get a lexical overlap score, duplicates (same id/title/content/type)
+    keep the highest score, and the survivors are boosted by embedding similarity when
+    a model is available. Duplicates share their text, so each is embedded only once.
+    """
+    tokset = set(tokenize_words(query))
+
     best: dict[tuple, DocSource] = {}
     for s in sources or []:
+        if s.score is None:
+            # Whole-token overlap, so "he" no longer matches inside "header"
+            s.score = float(len(tokset.intersection(_source_tokens(s))))
+
         key = (s.id, s.title, s.content, s.source_type)
         existing = best.get(key)
-        if existing is None:
+        if existing is None or s.score > existing.score:
             best[key] = s
-        else:
-            # Keep the one with higher score if available
-            if (s.score or 0.0) > (existing.score or 0.0):
-                best[key] = s
 
     deduped = list(best.values())
-    deduped.sort(key=lambda s: (-(s.score or 0.0), s.source_type, s.id))
-    return deduped
-
+    _maybe_embedding_score(query, deduped, q_emb=q_emb)
 
-def _score_sources(query: str, sources: list[DocSource]) -> list[DocSource]:
-    """Assign lexical scores to sources that lack a score, then optionally boost with embeddings."""
-    tokens = [t.lower() for t in re.findall(r"[A-Za-z0-9\\-]+", query or "") if len(t) > 2]
-    tokset = set(tokens)
+    deduped.sort(key=_rank_key)
+    return deduped
 
-    for s in sources or []:
-        if s.score is None:
-            haystack = f"{s.title} {s.content}".lower()
-            overlap = sum(1 for t in tokset if t in haystack)
-            s.score = float(overlap)
 
-    _maybe_embedding_score(query, sources)
-    return sources
+def _rank_key(s: DocSource) -> tuple:
+    return (-(s.score or 0.0), s.source_type, s.id)
 
 
 @lru_cache(maxsize=1)
@@ -211,8 +251,71 @@ def _get_embedding_model():
         return None
 
 
-def _maybe_embedding_score(query: str, sources: list[DocSource]) -> None:
-    """Boost scores using cosine similarity if sentence-transformers is available."""
+# Source embeddings keyed by "title content" text. The corpus changes slowly between
+# queries, so most sources are scored without another transformer forward pass.
+# Vectors are unit-normalized, so they are stored as int8 scaled by 127 (4x smaller).
+_SOURCE_EMBEDDINGS: OrderedDict = OrderedDict()
+_SOURCE_EMBEDDINGS_MAX = 50_000
+_INT8_SCALE = 127.0
+# Below this many rows, widening to int32 costs more than the bandwidth it saves
+_INT8_MATMUL_MIN_ROWS = 256
+
+
+def _quantize(vectors):
+    import numpy as np
+
+    return np.clip(np.round(vectors * _INT8_SCALE), -127, 127).astype(np.int8)
+
+
+def _similarities(mat_int8, q_emb):
+    """Cosine similarity of int8-quantized rows against a float query vector."""
+    import numpy as np
+
+    if len(mat_int8) < _INT8_MATMUL_MIN_ROWS:
+        return (mat_int8.astype(np.float32) / _INT8_SCALE) @ q_emb.astype(np.float32)
+
+    q_int8 = _quantize(q_emb)
+    dots = mat_int8.astype(np.int32) @ q_int8.astype(np.int32)
+    return dots.astype(np.float32) / (_INT8_SCALE * _INT8_SCALE)
+
+
+def _encode_sources(model, texts: list[str]):
+    """Return an (N, dim) int8 matrix of normalized embeddings, encoding only cache misses."""
+    import numpy as np
+
+    cache = _SOURCE_EMBEDDINGS
+    misses = [t for t in dict.fromkeys(texts) if t not in cache]
+    if misses:
+        embs = model.encode(misses, batch_size=32, normalize_embeddings=True, convert_to_numpy=True)
+        cache.update(zip(misses, _quantize(np.asarray(embs)), strict=True))
+
+    mat = np.stack([cache[t] for t in texts])
+
+    # Evict oldest entries once over budget
+    while len(cache) > _SOURCE_EMBEDDINGS_MAX:
+        cache.popitem(last=False)
+
+    return mat
+
+
+def _encode_query(query: str):
+    """Embed the query text, or return None if no embedding model is available."""
+    model = _get_embedding_model()
+    query_text = (query or "").strip()
+    if model is None or not query_text:
+        return None
+
+    try:
+        return model.encode([query_text], normalize_embeddings=True)[0]
+    except Exception:
+        return None
+
+
+def _maybe_embedding_score(query: str, sources: list[DocSource], q_emb=None) -> None:
+    """Boost scores using cosine similarity if sentence-transformers is available.
+
+    Pass a precomputed `q_emb` to skip re-encoding the query.
+    """
     model = _get_embedding_model()
     if model is None or not sources:
         return
@@ -222,26 +325,31 @@ def _maybe_embedding_score(query: str, sources: list[DocSource]) -> None:
     except Exception:
         return
 
-    query_text = (query or "").strip()
-    if not query_text:
+    texts: list[str] = []
+    scored: list[DocSource] = []
+    for s in sources:
+        text = f"{s.title} {s.content}".strip()
+        if text:
+            texts.append(text)
+            scored.append(s)
+
+    if not texts:
+        return
+
+    if q_emb is None:
+        q_emb = _encode_query(query)
+    if q_emb is None:
         return
 
+    # Encode uncached sources in a single batched call, then score all at once
     try:
-        q_emb = model.encode([query_text], normalize_embeddings=True)[0]
+        sims = _similarities(_encode_sources(model, texts), np.asarray(q_emb))
     except Exception:
         return
 
-    for s in sources:
-        text = f"{s.title} {s.content}".strip()
-        if not text:
-            continue
-        try:
-            s_emb = model.encode([text], normalize_embeddings=True)[0]
-            sim = float(np.dot(q_emb, s_emb))
-            # If existing score is present, blend; otherwise set to similarity
-            if s.score is None:
-                s.score = sim
-            else:
-                s.score = float(s.score) + sim
-        except Exception:
-            continue
+    for s, sim in zip(scored, sims, strict=True):
+        # If existing score is present, blend; otherwise set to similarity
+        if s.score is None:
+            s.score = float(sim)
+        else:
+            s.score = float(s.score) + float(sim)
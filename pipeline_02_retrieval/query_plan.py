@@ -0,0 +1,141 @@
+"""
+Algebra-level rewrites applied to retrieval SPARQL before it is evaluated.
+
+rdflib evaluates a basic graph pattern (BGP) as an index nested-loops join in
+list order, so the pattern that runs first decides how large every later
+intermediate result is. When the graph is an `IndexedGraph`, its indices give
+an exact match count per pattern, and the BGP is reordered smallest-first.
+
+Repeated triple patterns (including property paths) are dropped first: a BGP
+matches a solution once however many times a pattern is listed, so a copy
+only adds another index probe per partial solution.
+"""
+
+from rdflib import BNode, Graph, Variable
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import Query
+from rdflib.term import Node
+
+from database.rdf.indexed_graph import IndexedStore
+
+Pattern = tuple[Node, Node, Node]
+
+
+def plan_query(query: str, graph: Graph) -> Query:
+    """Parse `query`, drop repeated patterns from each BGP, and reorder the BGPs
+    using the graph's index statistics when it has them."""
+
+    prepared = prepareQuery(query)
+    store = graph.store
+    if isinstance(store, IndexedStore):
+        _rewrite_bgps(prepared.algebra, lambda triples: reorder_bgp(dedupe_bgp(triples), store))
+    else:
+        _rewrite_bgps(prepared.algebra, dedupe_bgp)
+
+    return prepared
+
+
+def _rewrite_bgps(node, rewrite):
+    """Apply `rewrite` to the triple list of every BGP under `node`, in place."""
+
+    if isinstance(node, CompValue):
+        if node.name == "BGP":
+            node["triples"] = rewrite(node["triples"])
+        for value in node.values():
+            _rewrite_bgps(value, rewrite)
+    elif isinstance(node, list):
+        for value in node:
+            _rewrite_bgps(value, rewrite)
+
+
+def dedupe_bgp(triples: list[Pattern]) -> list[Pattern]:
+    """Drop repeated triple patterns, keeping first occurrences in order.
+
+    Parsed patterns hold expanded terms and structurally comparable path objects,
+    so equal tuples are the same pattern (`?s rel:a+ ?o` twice included).
+    """
+
+    return list(dict.fromkeys(triples))
+
+
+def _is_var(term) -> bool:
+    return isinstance(term, (Variable, BNode))
+
+
+def reorder_bgp(triples: list[Pattern], store: IndexedStore) -> list[Pattern]:
+    """Order triple patterns greedily by estimated result size.
+
+    At each step the cheapest remaining pattern runs next, where variables bound
+    by earlier patterns count as join keys. Patterns sharing a variable with what
+    is already bound are preferred, so no step forms a Cartesian product.
+    """
+
+    remaining = list(triples)
+    ordered: list[Pattern] = []
+    bound: set = set()
+
+    while remaining:
+        best = min(
+            range(len(remaining)),
+            key=lambda i: (
+                bool(bound) and not _shares_var(remaining[i], bound),
+                _cardinality(store, remaining[i], bound),
+            ),
+        )
+        pattern = remaining.pop(best)
+        ordered.append(pattern)
+        bound.update(t for t in pattern if _is_var(t))
+
+    return ordered
+
+
+def _shares_var(pattern: Pattern, bound: set) -> bool:
+    return any(_is_var(t) and t in bound for t in pattern)
+
+
+def _cardinality(store: IndexedStore, pattern: Pattern, bound: set) -> float:
+    """Estimated matches for `pattern`, per binding of its already-bound variables.
+
+    Concrete terms are looked up exactly in the indices; a variable bound by an
+    earlier pattern divides the count by the number of distinct keys in that
+    position (the average fan-out per bound value).
+    """
+
+    s_join, p_join, o_join = (_is_var(t) and t in bound for t in pattern)
+    ids = []
+    for t in pattern:
+        if _is_var(t) or not isinstance(t, Node):
+            # Variables, and property paths (not in the indices), act as wildcards
+            ids.append(None)
+            continue
+        term_id = store.terms.lookup(t)
+        if term_id is None:
+            return 0
+        ids.append(term_id)
+    s, p, o = ids
+
+    if s is not None:
+        by_pred = store.spo.get(s, {})
+        n = len(by_pred.get(p, ())) if p is not None else sum(map(len, by_pred.values()))
+        return min(n, 1) if o_join else n
+
+    if o is not None:
+        by_pred = store.ops.get(o, {})
+        n = len(by_pred.get(p, ())) if p is not None else sum(map(len, by_pred.values()))
+        return min(n, 1) if s_join else n
+
+    if p is not None:
+        n = store.predicate_count.get(p, 0)
+        if s_join or o_join:
+            n /= max(len(store.pso.get(p, ())), 1)
+        return n
+
+    n = len(store)
+    if s_join:
+        n /= max(len(store.spo), 1)
+    if o_join:
+        n /= max(len(store.ops), 1)
+    if p_join:
+        n /= max(len(store.pso), 1)
+    return n
@@ -8,7 +8,7 @@ emits compact document-like records derived from RDF query results.
 import attr
 
 
-@attr.s
+@attr.s(slots=True)
 class DocSource:
     """Represents a single retrieved source item.
 
@@ -24,3 +24,5 @@ class DocSource:
     source_type: str = attr.ib()
     # Optional confidence/relevance score (higher is better).
     score: float | None = attr.ib(default=None)
+    # Lowercase word tokens of "title content", filled in lazily during scoring.
+    _tokens: set[str] | None = attr.ib(default=None, init=False, repr=False, eq=False)
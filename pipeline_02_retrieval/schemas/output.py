@@ -7,7 +7,7 @@ import attr
 from .doc import DocSource
 
 
-@attr.s
+@attr.s(slots=True)
 class Pipeline2Output:
     """Represents an object returned from Pipeline 2."""
 
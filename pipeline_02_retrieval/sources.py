@@ -98,6 +98,7 @@ Notes:
 """
 
 
+from functools import lru_cache
 from typing import List
 
 from rdflib.query import Result
@@ -134,7 +135,7 @@ def result_to_sources(res: Result) -> List[DocSource]:
         g = getattr(res, "graph", None)
         if g is None:
             return []
-        for s, p, o in g:
+        for s, p, o in g.triples((None, None, None)):
             doc = DocSource(
                 id=_format_term(s),
                 title=_format_term(p),
@@ -147,13 +148,11 @@ def result_to_sources(res: Result) -> List[DocSource]:
 
     # --- 3 Handle SELECT queries ---
     try:
-        variables = getattr(res, "vars", [])
-        rows = list(res)
+        variables = tuple(getattr(res, "vars", None) or ())
+        docs_append = docs.append
 
-        if not rows:
-            return []
-
-        for row in rows:
+        # Stream rows straight into DocSource records instead of copying them first
+        for row in res:
             data = row.asdict() if hasattr(row, "asdict") else dict(zip(variables, row))
 
             # Common RDF columns
@@ -169,7 +168,7 @@ def result_to_sources(res: Result) -> List[DocSource]:
                 source_type="SPARQL_SELECT",
                 score=None,
             )
-            docs.append(doc)
+            docs_append(doc)
 
     except Exception as e:
         print(f"[result_to_sources]  Error parsing RDF result: {e}")
@@ -181,6 +180,12 @@ def result_to_sources(res: Result) -> List[DocSource]:
 # Helper: Format RDF terms into readable strings
 # -------------------------------------------------------------------
 
+@lru_cache(maxsize=4096)
+def _uri_fragment(uri: str) -> str:
+    """Last path or fragment segment of a URI; graphs reuse few distinct URIs, so cache it."""
+    return uri.rsplit("/", 1)[-1].rsplit("#", 1)[-1]
+
+
 def _format_term(term) -> str:
     """Render an RDFLib term (URIRef, Literal, BNode) into clean text."""
     if term is None:
@@ -188,9 +193,8 @@ def _format_term(term) -> str:
     if isinstance(term, Literal):
         return str(term)
     if isinstance(term, URIRef):
-        uri = str(term)
         # Use only the human-readable fragment of the URI
-        return uri.rsplit("/", 1)[-1].rsplit("#", 1)[-1]
+        return _uri_fragment(str(term))
     if isinstance(term, BNode):
         return f"_:{term}"
     return str(term)
@@ -20,17 +20,23 @@ Extracted Medical Entities:
 
 """
 
-from typing import Any, Dict, List, Optional
+import re
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Optional
 
 from rdflib.query import Result
 from rdflib.term import BNode, Literal, URIRef
 
+from .sources import _uri_fragment
+
 
 def summarize_rdf_result(result: Optional[Result]) -> str:
     """
     Generate a text summary of an RDFLib SPARQL Result.
     Handles SELECT, ASK, CONSTRUCT, and DESCRIBE query outputs.
-    Tailored for summarizing medical RDF triples.
+    Tailored for summarizing medical RDF triples. Medical entities are extracted
+    from the displayed rows only.
     """
 
     # --- Step 1: Handle missing or invalid result ---
@@ -61,29 +67,36 @@ def summarize_rdf_result(result: Optional[Result]) -> str:
     # --- Step 4: Handle tabular SELECT query results ---
     try:
         variables = getattr(result, "vars", [])
-        records = list(result)
+        # Only the first 5 rows are kept; the rest are counted as they stream past.
+        # A result the caller already materialized (e.g. a cached SELECT) is not
+        # copied again, and none of the work below grows with the row count.
+        rows = iter(result)
+        head = list(islice(rows, 5))
 
-        if not records:
+        if not head:
             return "The SELECT query returned no results."
 
-        summary_lines = [f"🩺 Found {len(records)} record(s)."]
+        n_records = len(head) + sum(1 for _ in rows)
+
+        # --- Step 5: Optional medical entity extraction (over the displayed rows) ---
+        categories = detect_medical_entities(head, variables)
+
+        summary_lines = [f"🩺 Found {n_records} record(s)."]
         if variables:
             summary_lines.append(f"Variables: {', '.join(map(str, variables))}")
 
-        limit = min(5, len(records))
+        limit = len(head)
         summary_lines.append(f"\nShowing first {limit} record(s):")
 
         # Format each record (row) cleanly
-        for idx, record in enumerate(records[:limit], start=1):
+        for idx, record in enumerate(head, start=1):
             data = record.asdict() if hasattr(record, "asdict") else dict(zip(variables, record))
             formatted_pairs = [f"{var}: {format_term(data.get(var))}" for var in variables]
             summary_lines.append(f"  {idx}. {', '.join(formatted_pairs)}")
 
-        if len(records) > limit:
-            summary_lines.append(f"  ... and {len(records) - limit} more result(s).")
+        if n_records > limit:
+            summary_lines.append(f"  ... and {n_records - limit} more result(s).")
 
-        # --- Step 5: Optional medical entity extraction ---
-        categories = detect_medical_entities(records, variables)
         if categories:
             summary_lines.append("\nExtracted Medical Entities:")
             for label, terms in categories.items():
@@ -105,6 +118,7 @@ def result_to_summary(result: Optional[Result]) -> str:
 # Helper Functions
 # -------------------------------------------------------------------
 
+
 def format_term(term: Any) -> str:
     """
     Convert RDFLib terms (URIRef, Literal, BNode) into compact, readable text.
@@ -114,37 +128,69 @@ def format_term(term: Any) -> str:
     if isinstance(term, Literal):
         return str(term)
     if isinstance(term, URIRef):
-        uri_str = str(term)
         # Keep only the meaningful part (last fragment of URI)
-        return uri_str.rsplit("/", 1)[-1].rsplit("#", 1)[-1]
+        return _uri_fragment(str(term))
     if isinstance(term, BNode):
         return f"_:{term}"
     return str(term)
 
 
-def detect_medical_entities(records: List[Any], variables: List[str]) -> Dict[str, List[str]]:
+# Substring cues per category; e.g. "flu" also flags "Influenza".
+_KEYWORD_MAP = {
+    "Disease": ["disease", "syndrome", "disorder", "infection", "cancer", "flu"],
+    "Drug": ["drug", "compound", "insulin", "aspirin", "therapy", "treatment"],
+    "Gene": ["gene", "protein", "enzyme", "mutation"],
+    "Symptom": ["symptom", "pain", "fever", "nausea"],
+}
+# One bit per category, so a term's categories accumulate in a single int
+_CAT_BITS = {cat: 1 << i for i, cat in enumerate(_KEYWORD_MAP)}
+_CUE_BITS = {cue: _CAT_BITS[cat] for cat, cues in _KEYWORD_MAP.items() for cue in cues}
+# Zero-width lookahead so overlapping cues ("painsulin") are all reported in one scan
+_CUES_RE = re.compile("(?=(" + "|".join(map(re.escape, _CUE_BITS)) + "))")
+_SEP = "\x00"
+_SEP_RE = re.compile(_SEP)
+
+
+def detect_medical_entities(records: list[Any], variables: list[str]) -> dict[str, list[str]]:
     """
     Identify and group medically relevant entities from RDF query results
     (e.g., diseases, drugs, genes, symptoms).
     """
-    keyword_map = {
-        "Disease": ["disease", "syndrome", "disorder", "infection", "cancer", "flu"],
-        "Drug": ["drug", "compound", "insulin", "aspirin", "therapy", "treatment"],
-        "Gene": ["gene", "protein", "enzyme", "mutation"],
-        "Symptom": ["symptom", "pain", "fever", "nausea"],
-    }
-
-    detected: Dict[str, set] = {k: set() for k in keyword_map}
-
+    values = []
     for rec in records:
         data = rec.asdict() if hasattr(rec, "asdict") else dict(zip(variables, rec))
-        for val in data.values():
-            if not val:
-                continue
-            text = str(val).lower()
-            for category, cues in keyword_map.items():
-                if any(cue in text for cue in cues):
-                    detected[category].add(format_term(val))
-
-    # Filter out empty groups
-    return {cat: sorted(list(vals)) for cat, vals in detected.items() if vals}
+        values.extend(val for val in data.values() if val)
+
+    # Lowercase and scan all values as one separator-joined blob, then map each
+    # cue hit back to its value by offset (cues never contain the separator).
+    blob = _SEP.join(map(str, values)).lower()
+    bounds = [m.start() for m in _SEP_RE.finditer(blob)]
+    if len(bounds) == len(values) - 1:
+        masks = [0] * len(values)
+        for m in _CUES_RE.finditer(blob):
+            masks[bisect_right(bounds, m.start())] |= _CUE_BITS[m.group(1)]
+    else:
+        # A value contains the separator itself; offsets would be misattributed
+        masks = [_cue_mask(str(val).lower()) for val in values]
+
+    terms: dict[str, int] = {}
+    for val, mask in zip(values, masks, strict=True):
+        if mask:
+            term = format_term(val)
+            terms[term] = terms.get(term, 0) | mask
+
+    # Scatter terms into their categories; empty groups are left out
+    detected: dict[str, list[str]] = {}
+    for cat, bit in _CAT_BITS.items():
+        vals = sorted(term for term, mask in terms.items() if mask & bit)
+        if vals:
+            detected[cat] = vals
+
+    return detected
+
+
+def _cue_mask(text: str) -> int:
+    mask = 0
+    for m in _CUES_RE.finditer(text):
+        mask |= _CUE_BITS[m.group(1)]
+    return mask
@@ -1,98 +1,125 @@
 from __future__ import annotations
 
 import re
-from textwrap import dedent
+import string
+from collections.abc import Iterable
+from functools import lru_cache
 
-from spacy.tokens import Doc
+from spacy.tokens import Doc, Span
 
 # Use the same prefix as the ingestion pipeline to avoid mismatches
 REL = "http://example.org/rel/"
 
 # Mentions we never want to treat as the subject
-_STOP_MENTIONS = {
-    "which enzyme",
-    "what",
-    "which",
-    "who",
-    "where",
-    "when",
-    "why",
-    "enzyme",
-    "drug",
-    "medicine",
-    # Additional generic/question words we never want as subject mentions
-    "do",
-    "does",
-    "did",
-    "is",
-    "are",
-    "was",
-    "were",
-    "can",
-    "could",
-    "would",
-    "should",
-    "may",
-    "might",
-    "will",
-    "shall",
-}
+_STOP_MENTIONS = frozenset(
+    {
+        "which enzyme",
+        "what",
+        "which",
+        "who",
+        "where",
+        "when",
+        "why",
+        "enzyme",
+        "drug",
+        "medicine",
+        # Additional generic/question words we never want as subject mentions
+        "do",
+        "does",
+        "did",
+        "is",
+        "are",
+        "was",
+        "were",
+        "can",
+        "could",
+        "would",
+        "should",
+        "may",
+        "might",
+        "will",
+        "shall",
+    }
+)
+
+# Characters that make a mention look like a biomedical name (e.g. "CYP3A4", "COX-2")
+_BIOMED_CHARS = frozenset(string.ascii_uppercase + string.digits + "-")
+
+# Token shapes of capitalized / acronym-like single tokens
+_SHAPES = frozenset({"Xxxx", "XX", "XXX", "Xx"})
+
+# Translation table deleting Latin letters, digits, Greek letters and hyphens
+_NAME_CHARS = (
+    string.ascii_letters
+    + string.digits
+    + "".join(map(chr, range(ord("α"), ord("ω") + 1)))
+    + "".join(map(chr, range(ord("Α"), ord("Ω") + 1)))
+    + "-"
+)
+_DROP_NAME_CHARS = str.maketrans("", "", _NAME_CHARS)
 
 # --- Intent detection patterns (your logic) -----------------------------------
 
+# Patterns are listed in priority order: the first intent whose pattern occurs
+# anywhere in the text wins, regardless of where in the text it matches.
 _INTENT_PATTERNS = [
     (
         "mechanism_of_action",
-        re.compile(
-            r"\bmechanism of action\b|\bacts by\b|\binhibit(s|ing)?\b|\bstimulate(s|ing)?\b",
-            re.I,
-        ),
+        r"\bmechanism of action\b|\bacts by\b|\binhibit(?:s|ing)?\b|\bstimulate(?:s|ing)?\b",
     ),
     (
         "indication",
-        re.compile(
-            r"\bindication(s)?\b|\bused for\b|\btreat(s|ment)? of\b",
-            re.I,
-        ),
+        r"\bindication(?:s)?\b|\bused for\b|\btreat(?:s|ment)? of\b",
     ),
     (
         "contraindication",
-        re.compile(
-            r"\bcontraindication(s)?\b|\bcontraindicated\b|\bavoid in\b",
-            re.I,
-        ),
+        r"\bcontraindication(?:s)?\b|\bcontraindicated\b|\bavoid in\b",
     ),
     (
         "adverse_effect",
-        re.compile(
-            r"\bside effect(s)?\b|\badverse\b|\btoxicit(y|ies)\b",
-            re.I,
-        ),
+        r"\bside effect(?:s)?\b|\badverse\b|\btoxicit(?:y|ies)\b",
     ),
     (
         "dose",
-        re.compile(
-            r"\bdose|dosage|dosing\b",
-            re.I,
-        ),
+        r"\bdose|dosage|dosing\b",
     ),
     (
         "drug_target",
-        re.compile(
-            r"\btarget(s)?\b|\bbinds?\b|\breceptor\b|\benzyme\b",
-            re.I,
-        ),
+        r"\btarget(?:s)?\b|\bbinds?\b|\breceptor\b|\benzyme\b",
     ),
 ]
 
 
+def _predicate_filter(intent: str) -> str:
+    """FILTER line matching predicates whose IRI contains any keyword of the intent."""
+    # Use simple keyword filters over predicate IRIs to stay schema-agnostic.
+    intent_filters = [
+        f'CONTAINS(LCASE(STR(?predicate)), "{kw.lower()}")' for kw in intent.split("_") if kw
+    ]
+    return f"  FILTER({' || '.join(intent_filters)})\n" if intent_filters else ""
+
+
+# Intent name -> prebuilt predicate FILTER line for the intent-aware query block
+_INTENT_FILTERS = {name: _predicate_filter(name) for name, _pat in _INTENT_PATTERNS}
+
+# One anchored match tries each intent as a lookahead in priority order, so a single
+# call replaces a Python loop of searches; `lastgroup` names the intent that matched.
+_INTENT_RE = re.compile(
+    "^(?:" + "|".join(f"(?=.*?(?P<{name}>{pat}))" for name, pat in _INTENT_PATTERNS) + ")",
+    re.I | re.S,
+)
+_WHAT_RE = re.compile(r"\s*what\b", re.I)
+_intent_match = _INTENT_RE.match
+_what_match = _WHAT_RE.match
+
+
 def _detect_intent(text: str) -> str | None:
     """Infer high-level intent (what relation is being asked about) from raw text."""
-    for name, pat in _INTENT_PATTERNS:
-        if pat.search(text):
-            return name
+    m = _intent_match(text)
+    if m:
+        return m.lastgroup
     # Very rough fallback: "what ..." questions → assume mechanism_of_action
-    if re.match(r"^\s*what\b", text.strip(), re.I):
+    if _what_match(text):
         return "mechanism_of_action"
     return None
 
@@ -100,6 +127,18 @@ def _detect_intent(text: str) -> str | None:
 # --- Mention extraction (your improved heuristic) -----------------------------
 
 
+# Per Doc class: (has `ents`, has `noun_chunks`), looked up once instead of per call
+_CAPS: dict[type, tuple[bool, bool]] = {}
+
+
+def _doc_caps(doc: Doc) -> tuple[bool, bool]:
+    cls = type(doc)
+    caps = _CAPS.get(cls)
+    if caps is None:
+        caps = _CAPS[cls] = (hasattr(cls, "ents"), hasattr(cls, "noun_chunks"))
+    return caps
+
+
 def _extract_mentions(doc: Doc) -> list[str]:
     """
     Extract candidate 'mentions' (drug names, enzymes, etc.) from a Doc.
@@ -108,113 +147,113 @@ def _extract_mentions(doc: Doc) -> list[str]:
       1. Prefer named entities (doc.ents) if available.
       2. Add noun chunks.
       3. Add capitalized / chemical-ish single tokens.
-      4. De-duplicate (case-insensitive), keep track of first-seen position.
+      4. De-duplicate (case-insensitive), keeping first-seen order.
       5. Sort: longer first, tie-break by original position.
     """
-    cands_with_pos: list[tuple[str, int]] = []
+    cands: list[str] = []
     seen_lower: set[str] = set()
+    seen_add = seen_lower.add
 
-    def _add(s: str, pos: int):
-        s = s.strip()
+    def _add(s: str):
         # Ignore very short fragments; they tend to be auxiliaries like "Do", "Is".
-        if not (3 <= len(s) <= 80):
+        # Stripping only shortens, so too-short input is rejected before any copy.
+        if len(s) < 3:
+            return
+        if s[0].isspace() or s[-1].isspace():
+            s = s.strip()
+            if len(s) < 3:
+                return
+        if len(s) > 80:
             return
         k = s.lower()
         if k in seen_lower:
             return
-        seen_lower.add(k)
-        cands_with_pos.append((s, pos))
+        seen_add(k)
+        cands.append(s)
 
-    pos = 0
+    has_ents, has_noun_chunks = _doc_caps(doc)
 
     # 1) named entities, if available
-    if getattr(doc, "ents", None):
+    if has_ents:
         for ent in doc.ents:
-            _add(ent.text, pos)
-            pos += 1
+            _add(ent.text)
 
     # 2) noun chunks
-    for span in getattr(doc, "noun_chunks", []):
-        _add(span.text, pos)
-        pos += 1
+    if has_noun_chunks:
+        for span in doc.noun_chunks:
+            _add(span.text)
 
     # 3) capitalized / chemical-ish single tokens
     for t in doc:
-        if re.search(r"[A-Za-z0-9α-ωΑ-Ω\-]+", t.text) and (
-            t.shape_ in {"Xxxx", "XX", "XXX", "Xx"} or "-" in t.text
-        ):
-            _add(t.text, pos)
-            pos += 1
+        text = t.text
+        # Deleting the name characters changes the text iff it contains at least one
+        if (t.shape_ in _SHAPES or "-" in text) and text.translate(_DROP_NAME_CHARS) != text:
+            _add(text)
 
-    # 4) sort: longer first, tie-break by original position
-    cands_with_pos.sort(key=lambda p: (-len(p[0]), p[1]))
-
-    # 5) return just the strings
-    return [s for s, _ in cands_with_pos]
+    # 4) sort: longer first; the sort is stable (also with reverse=True), so equal
+    #    lengths keep their first-seen order without carrying positions around
+    cands.sort(key=len, reverse=True)
+    return cands
 
 
 # --- Subject / label binding helpers -----------------------------------------
 
+# Quotes and backslashes would break out of the SPARQL string literal
+_SANITIZE_TABLE = str.maketrans({'"': " ", "\\": " "})
+_SANITIZE_BYTES_TABLE = bytes.maketrans(b'"\\', b"  ")
+
 
 def _sanitize_mention(m: str) -> str:
     # Keep only harmless chars inside a quoted string
-    m = re.sub(r'["\\]', " ", m)
-    return " ".join(m.split()).strip()
+    if m.isascii():
+        # Byte-table translate is much cheaper than str.translate's dict lookups
+        return " ".join(m.encode("ascii").translate(_SANITIZE_BYTES_TABLE).decode("ascii").split())
+    return " ".join(m.translate(_SANITIZE_TABLE).split())
 
 
 def _pick_best_mention(mentions: list[str]) -> str | None:
     """
     From a list of mention strings, pick the best candidate for the subject.
+
+    Prefers the first good-looking biomedical string (uppercase/digits/hyphens);
+    otherwise falls back to the first non-stop mention.
     """
-    # 1) prefer good-looking biomedical strings with uppercase/digits/hyphens
+    first_ok: str | None = None
     for m in mentions:
         m_clean = m.strip()
-        if not m_clean:
+        if m_clean.lower() in _STOP_MENTIONS:
             continue
-        low = m_clean.lower()
-        if low in _STOP_MENTIONS:
-            continue
-        if re.search(r"[A-Z0-9\-]", m_clean):
+        if not _BIOMED_CHARS.isdisjoint(m_clean):
             return m_clean
+        if first_ok is None:
+            first_ok = m_clean
 
-    # 2) fallback: first non-stop mention
-    for m in mentions:
-        if m.strip().lower() not in _STOP_MENTIONS:
-            return m.strip()
-
-    return None
+    return first_ok
 
 
 def _wrap_prefixes(q: str) -> str:
-    return dedent(
-        f"""
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX rel: <{REL}>
-        {q.strip()}
-        """
-    ).strip()
+    return _PREFIX_HEADER + q.strip()
 
 
 def _extract_kb_ids(doc: Doc) -> list[str]:
     """
     Collect KB IDs from entities if available (e.g., SciSpaCy linker).
     """
-    ids: list[str] = []
-    seen: set[str] = set()
-    for ent in getattr(doc, "ents", []) or []:
-        kb_id = getattr(ent, "kb_id_", "") or ""
-        if kb_id:
-            k = kb_id.strip()
-            if k and k not in seen:
-                seen.add(k)
-                ids.append(k)
-        # scispacy_linker exposes ent._.kb_ents as list of (id, score)
-        if hasattr(ent._, "kb_ents"):
-            for kb, _score in getattr(ent._, "kb_ents", []) or []:
+    # Insertion-ordered dict doubles as the "seen" set
+    seen: dict[str, None] = {}
+    # scispacy_linker exposes ent._.kb_ents as list of (id, score)
+    has_kb_ents = Span.has_extension("kb_ents")
+
+    for ent in doc.ents:
+        k = ent.kb_id_.strip()
+        if k and k not in seen:
+            seen[k] = None
+        if has_kb_ents:
+            for kb, _score in ent._.kb_ents or []:
                 if kb and kb not in seen:
-                    seen.add(kb)
-                    ids.append(kb)
-    return ids
+                    seen[kb] = None
+
+    return list(seen)
 
 
 def _subject_binding_inline_filter(mention: str, kb_ids: list[str] | None = None) -> str:
@@ -222,34 +261,45 @@ def _subject_binding_inline_filter(mention: str, kb_ids: list[str] | None = None
     Bind ?subj by label, and optionally by known KB IDs (e.g., MeSH codes).
     """
     m = _sanitize_mention(mention)
-    blocks = [
-        dedent(
-            f"""
-            {{
-              ?subj rdfs:label ?lbl .
-              FILTER( CONTAINS(LCASE(STR(?lbl)), LCASE("{m}")) )
-            }}
-            """
-        ).strip()
-    ]
+    blocks = [_LABEL_BIND_TMPL.format(mention=m)]
 
     kb_ids = kb_ids or []
     for kb in kb_ids:
         kb_clean = _sanitize_mention(kb)
         if not kb_clean:
             continue
-        blocks.append(
-            dedent(
-                f"""
-                {{
-                  ?subj rel:has_mesh_id ?mid .
-                  FILTER( LCASE(STR(?mid)) = LCASE("{kb_clean}") )
-                }}
-                """
-            ).strip()
-        )
+        blocks.append(_MESH_BIND_TMPL.format(kb_id=kb_clean))
 
     return "\nUNION\n".join(blocks)
+
+
+# --- SPARQL templates (filled with str.format) ------------------------------
+
+_PREFIX_HEADER = f"PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>\nPREFIX rel: <{REL}>\n"
+
+_LABEL_BIND_TMPL = """{{
+  ?subj rdfs:label ?lbl .
+  FILTER( CONTAINS(LCASE(STR(?lbl)), LCASE("{mention}")) )
+}}"""
+
+_MESH_BIND_TMPL = """{{
+  ?subj rel:has_mesh_id ?mid .
+  FILTER( LCASE(STR(?mid)) = LCASE("{kb_id}") )
+}}"""
+
+# `intent_filter` is either empty or a complete "  FILTER(...)\n" line
+_MATCH_BLOCK_TMPL = """{{
+{subj_bind}
+  ?subj ?predicate ?object .
+  OPTIONAL {{ ?object rdfs:label ?objectLabel . }}
+{intent_filter}}}"""
+
+_SELECT_TMPL = """SELECT ?predicate ?object ?objectLabel WHERE {{
+{intent_block}
+UNION
+{fallback_block}
+}}
+LIMIT 100"""
 
 
 # --- Main: Doc → SPARQL query -------------------------------------------------
@@ -265,6 +315,23 @@ def tokens_to_query(tokens: Doc) -> str:
       - label-based subject binding in the RDF graph
     """
 
+    return _build_query(*_query_inputs(tokens))
+
+
+def tokens_to_queries(docs: Iterable[Doc]) -> list[str]:
+    """
+    Batch variant of `tokens_to_query`, e.g. for Docs streamed from `nlp.pipe`.
+
+    Queries are assembled through the same cache, so repeated questions in a
+    batch are only built once.
+    """
+    build = _build_query
+    return [build(*_query_inputs(doc)) for doc in docs]
+
+
+def _query_inputs(tokens: Doc) -> tuple[str, tuple[str, ...], tuple[str, ...]]:
+    """The Doc-derived inputs of `_build_query`: (text, mentions, kb_ids)."""
+
     text = tokens.text
 
     # 1) Extract candidate mentions from the Doc
@@ -272,19 +339,31 @@ def tokens_to_query(tokens: Doc) -> str:
 
     # 2) Expand mentions using abbreviations, if SciSpaCy abbreviation detector is present
     abbrev_map: dict[str, str] = {}
-    if hasattr(tokens._, "abbreviations"):
-        for ab in getattr(tokens._, "abbreviations", []):
+    # Registered extensions live on the Doc class; no need to build `tokens._` to ask
+    if Doc.has_extension("abbreviations"):
+        for ab in tokens._.abbreviations or []:
             abbrev_map[str(ab)] = str(ab._.long_form)
 
     expanded = [abbrev_map.get(m, m) for m in mentions]
     # deduplicate while preserving order
-    mentions = list(dict.fromkeys(expanded))
+    mentions = tuple(dict.fromkeys(expanded))
+
+    # 2.5) Collect KB IDs from entities (if linker present)
+    kb_ids = tuple(_extract_kb_ids(tokens))
+
+    return text, mentions, kb_ids
+
+
+@lru_cache(maxsize=1024)
+def _build_query(text: str, mentions: tuple[str, ...], kb_ids: tuple[str, ...]) -> str:
+    """
+    Assemble the SPARQL query from the Doc-derived inputs.
+
+    Cached, since repeated or templated questions yield the same inputs.
+    """
 
     # 3) Detect intent from the raw text
     intent = _detect_intent(text)
-
-    # 3.5) Collect KB IDs from entities (if linker present)
-    kb_ids = _extract_kb_ids(tokens)
 
     # 4) Choose the best subject mention
     chosen = _pick_best_mention(mentions)
@@ -292,51 +371,18 @@ def tokens_to_query(tokens: Doc) -> str:
         # Harmless always-empty query if we couldn't find a subject
         return _wrap_prefixes("SELECT ?answer WHERE { VALUES ?answer { } }")
 
-    subj_bind = _subject_binding_inline_filter(chosen, kb_ids=kb_ids)
+    subj_bind = _subject_binding_inline_filter(chosen, kb_ids=list(kb_ids))
 
     # 5) Build a filtered block (intent-aware) and a general fallback block.
     #    This avoids empty results when intent-specific predicates are missing.
-    intent_filters = []
-    if intent:
-        # Use simple keyword filters over predicate IRIs to stay schema-agnostic.
-        intent_kw = intent.replace("_", " ")
-        for kw in intent_kw.split():
-            kw = kw.strip()
-            if not kw:
-                continue
-            intent_filters.append(f'CONTAINS(LCASE(STR(?predicate)), "{kw.lower()}")')
-
-    intent_filter_expr = " || ".join(intent_filters) if intent_filters else ""
+    intent_filter = _INTENT_FILTERS[intent] if intent else ""
+    intent_block = _MATCH_BLOCK_TMPL.format(subj_bind=subj_bind, intent_filter=intent_filter)
+    fallback_block = _MATCH_BLOCK_TMPL.format(subj_bind=subj_bind, intent_filter="")
 
-    intent_block = dedent(
-        f"""
-        {{
-          {subj_bind}
-          ?subj ?predicate ?object .
-          OPTIONAL {{ ?object rdfs:label ?objectLabel . }}
-          {"FILTER(" + intent_filter_expr + ")" if intent_filter_expr else ""}
-        }}
-        """
-    ).strip()
+    body = _SELECT_TMPL.format(intent_block=intent_block, fallback_block=fallback_block)
+    return _wrap_prefixes(body)
 
-    fallback_block = dedent(
-        f"""
-        {{
-          {subj_bind}
-          ?subj ?predicate ?object .
-          OPTIONAL {{ ?object rdfs:label ?objectLabel . }}
-        }}
-        """
-    ).strip()
 
-    body = dedent(
-        f"""
-        SELECT ?predicate ?object ?objectLabel WHERE {{
-          {intent_block}
-          UNION
-          {fallback_block}
-        }}
-        LIMIT 100
-        """
-    )
-    return _wrap_prefixes(body)
+def clear_query_cache():
+    """Drop the queries cached by `tokens_to_query`."""
+    _build_query.cache_clear()
@@ -2,6 +2,7 @@
 Defines schemas/contracts to use inside of and between pipelines.
 """
 
+import sys
 from enum import Enum
 
 import attr
@@ -66,15 +67,19 @@ class POSTag(Enum):
     """Other"""
 
 
-@attr.s
+@attr.s(slots=True, frozen=True)
 class Token:
-    """Represents an atomic unit of information in a sentence."""
+    """Represents an atomic unit of information in a sentence.
 
-    text: str = attr.ib()
+    Immutable and hashable; `text` and `lemma` are interned, since a corpus
+    repeats a small vocabulary many times.
+    """
+
+    text: str = attr.ib(converter=sys.intern)
     """Original text."""
 
-    lemma: str = attr.ib()
+    lemma: str = attr.ib(converter=sys.intern)
     """If the token is a word, lemma is the gramatical root of the word."""
 
-    pos: POSTag = attr.ib()
+    pos: POSTag = attr.ib(validator=attr.validators.instance_of(POSTag))
     """Part-of-speech tag for the token."""
@@ -1,15 +1,43 @@
+import os
+import uuid
+
 import pytest
 import redis
 
+# Redis dbs 1-15 are handed out one per xdist worker; db 0 is left to the app
+_TEST_DBS = 15
+
+
+def _worker_db() -> int:
+    """Redis db index for this test worker, so parallel (xdist) workers never share a db."""
+
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    index = int(worker.removeprefix("gw") or 0)
+    if index >= _TEST_DBS:
+        raise pytest.UsageError(
+            f"Redis has test dbs for {_TEST_DBS} workers; run with -n {_TEST_DBS} or fewer"
+        )
+    return 1 + index
+
+
+def _unlink_prefixed(db: redis.Redis, prefix: str):
+    """Drop the keys under `prefix`; UNLINK frees values in the background, unlike DEL."""
+
+    keys = list(db.scan_iter(match=f"{prefix}*", count=1000))
+    if keys:
+        db.unlink(*keys)
+
 
 @pytest.fixture(autouse=True, name="db")
 def redis_fixture(monkeypatch):
-    """Change default redis connection db."""
+    """Change default redis connection db, and give the test its own key prefix."""
 
-    db = redis.StrictRedis(host="localhost", port=6379, db=1, decode_responses=True)
-    monkeypatch.setattr("database.redis.redis.DEFAULT_REDIS_DB", 1)
+    db_index = _worker_db()
+    prefix = f"test:{uuid.uuid4().hex}:"
+    db = redis.StrictRedis(host="localhost", port=6379, db=db_index, decode_responses=True)
+    monkeypatch.setattr("database.redis.redis.DEFAULT_REDIS_DB", db_index)
+    monkeypatch.setattr("database.redis.redis.KEY_PREFIX", prefix)
 
-    db.flushdb()
     yield db
-    db.flushdb()
+    _unlink_prefixed(db, prefix)
     db.close()
@@ -0,0 +1,76 @@
+from rdflib import Literal, Namespace, Variable
+from rdflib.namespace import RDFS
+
+from database.rdf.indexed_graph import IndexedGraph
+from pipeline_02_retrieval.query_plan import dedupe_bgp, plan_query, reorder_bgp
+
+NS = Namespace("http://example.org/node/")
+REL = Namespace("http://example.org/rel/")
+
+
+def seed_graph() -> IndexedGraph:
+    graph = IndexedGraph()
+    for i in range(20):
+        graph.add((NS[f"drug{i}"], RDFS.label, Literal(f"drug {i}")))
+        graph.add((NS[f"drug{i}"], REL["treats"], NS[f"disease{i % 4}"]))
+    graph.add((NS["disease1"], RDFS.label, Literal("hypertension")))
+    return graph
+
+
+def test_reorder_bgp_runs_most_selective_pattern_first():
+    graph = seed_graph()
+    drug, disease, label = Variable("drug"), Variable("disease"), Variable("label")
+    bgp = [
+        (drug, RDFS.label, label),
+        (drug, REL["treats"], disease),
+        (disease, RDFS.label, Literal("hypertension")),
+    ]
+
+    ordered = reorder_bgp(bgp, graph.store)
+
+    assert ordered[0] == (disease, RDFS.label, Literal("hypertension"))
+    assert ordered[1] == (drug, REL["treats"], disease)
+    assert sorted(ordered) == sorted(bgp)
+
+
+def test_planned_query_returns_same_rows():
+    graph = seed_graph()
+    query = """
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX rel: <http://example.org/rel/>
+    SELECT ?label WHERE {
+      ?drug rdfs:label ?label .
+      ?drug rel:treats ?disease .
+      ?disease rdfs:label "hypertension" .
+    }
+    """
+
+    planned = sorted(row.label for row in graph.query(plan_query(query, graph)))
+
+    assert planned == sorted(row.label for row in graph.query(query))
+    assert len(planned) == 5
+
+
+def test_duplicated_bgp_patterns_are_removed_without_changing_results():
+    graph = seed_graph()
+    graph.add((NS["disease1"], REL["subtype_of"], NS["disease0"]))
+    graph.add((NS["disease0"], REL["subtype_of"], NS["disease2"]))
+    query = """
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX rel: <http://example.org/rel/>
+    SELECT ?drug ?parent WHERE {
+      ?disease rdfs:label "hypertension" .
+      ?drug rel:treats ?disease .
+      ?disease rel:subtype_of+ ?parent .
+      ?drug rel:treats ?disease .
+      ?disease rel:subtype_of+ ?parent .
+      ?disease rdfs:label "hypertension" .
+    }
+    """
+
+    planned = plan_query(query, graph)
+    bgp = planned.algebra["p"]["p"]
+
+    assert len(bgp["triples"]) == 3
+    assert dedupe_bgp(bgp["triples"]) == bgp["triples"]
+    assert sorted(graph.query(planned)) == sorted(graph.query(query))
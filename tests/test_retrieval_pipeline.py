@@ -1,14 +1,37 @@
+import asyncio
+
+import pytest
 from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import RDFS
 
-from pipeline_02_retrieval.pipeline import run_pipeline
+from database.rdf.indexed_graph import IndexedGraph
+from database.rdf.rdf import RDFDatabase
+from pipeline_02_retrieval.bm25 import (
+    _index_texts_arrow,
+    _index_texts_python,
+    get_bm25_index,
+)
+from pipeline_02_retrieval.pipeline import (
+    _execute_query,
+    run_pipeline,
+    run_pipeline_async,
+)
 
 
 class DummyDb:
-    """Minimal DB stub exposing an RDFLib graph."""
+    """Minimal DB stub exposing an indexed RDFLib graph."""
 
     def __init__(self):
-        self.graph = Graph()
+        self.graph = IndexedGraph()
+
+
+@pytest.fixture
+def rdf_db(monkeypatch, tmp_path) -> RDFDatabase:
+    """A fresh `RDFDatabase` singleton persisting to a temporary directory."""
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(RDFDatabase, "instance", None)
+    return RDFDatabase()
 
 
 def seed_graph_with_hypertension(db: DummyDb):
@@ -34,6 +57,17 @@ def test_retrieval_pipeline_returns_sources_from_labeled_subject():
     assert all(s.score is not None for s in out.sources), "Expected sources to be scored"
 
 
+def test_retrieval_pipeline_async_matches_sync():
+    db = DummyDb()
+    seed_graph_with_hypertension(db)
+
+    expected = run_pipeline(db=db, text="What is hypertension?")
+    out = asyncio.run(run_pipeline_async(db=db, text="What is hypertension?"))
+
+    assert out.sources
+    assert out == expected
+
+
 def test_retrieval_pipeline_uses_fallback_when_sparql_empty():
     db = DummyDb()
     seed_graph_with_hypertension(db)
@@ -58,3 +92,86 @@ def test_retrieval_pipeline_refuses_when_no_evidence():
     assert "not enough evidence" in out.summary.lower()
     assert out.grounded_answer
     assert "not enough evidence" in out.grounded_answer.lower()
+
+
+def test_retrieval_pipeline_cache_sees_graph_updates():
+    db = DummyDb()
+
+    out = run_pipeline(db=db, text="What is hypertension?")
+    assert not out.sources
+
+    seed_graph_with_hypertension(db)
+    out = run_pipeline(db=db, text="What is hypertension?")
+
+    assert out.sources, "Cached results should be invalidated when the graph changes"
+
+
+def test_bm25_index_sees_same_size_graph_updates(rdf_db: RDFDatabase):
+    rdf_db.apply_json([{"s": "hypertension", "p": "has_title", "o": "Hypertension Overview"}])
+    assert get_bm25_index(rdf_db).score(["overview"])
+
+    # Swap a literal: the graph keeps its size but the index must still be rebuilt
+    subj, pred, obj = next(
+        iter(rdf_db.graph.triples((None, None, Literal("Hypertension Overview"))))
+    )
+    size = len(rdf_db.graph)
+    rdf_db.graph.remove((subj, pred, obj))
+    rdf_db.graph.add((subj, pred, Literal("Hypertension Summary")))
+    assert len(rdf_db.graph) == size
+
+    index = get_bm25_index(rdf_db)
+    assert not index.score(["overview"])
+    assert index.score(["summary"])
+
+
+def test_bm25_index_is_not_cached_for_unversioned_graphs():
+    db = DummyDb()
+    db.graph = Graph()
+    seed_graph_with_hypertension(db)
+
+    assert get_bm25_index(db) is not get_bm25_index(db)
+
+
+def test_bm25_arrow_and_python_index_builds_agree():
+    pytest.importorskip("pyarrow")
+    docs = [
+        ["Hypertension (HTN)", "High BLOOD pressure; high-risk!"],
+        [],
+        ["", "  ", "a an the"],
+        ["ACE-inhibitors, e.g. Lisinopril", "café résumé", "hypertension"],
+        ["x_y z--z 123 4567"],
+    ]
+
+    arrow_postings, arrow_lengths = _index_texts_arrow(docs)
+    python_postings, python_lengths = _index_texts_python(docs)
+
+    assert list(arrow_lengths) == list(python_lengths)
+    assert arrow_postings.keys() == python_postings.keys()
+    for term, (doc_ids, freqs) in python_postings.items():
+        arrow_ids, arrow_freqs = arrow_postings[term]
+        assert list(arrow_ids) == list(doc_ids), term
+        assert list(arrow_freqs) == list(freqs), term
+
+
+def test_query_results_are_cached_per_rdf_database_graph_state(rdf_db: RDFDatabase):
+    rdf_db.apply_json([{"s": "hypertension", "p": "has_title", "o": "Hypertension Overview"}])
+    query = """
+    PREFIX rel: <http://example.org/rel/>
+    SELECT ?title WHERE { ?s rel:has_title ?title . }
+    """
+
+    first = _execute_query(rdf_db, query)
+    assert _execute_query(rdf_db, query) is first
+    assert [str(row.title) for row in first] == ["Hypertension Overview"]
+    # Cached results stay iterable
+    assert [str(row.title) for row in first] == ["Hypertension Overview"]
+
+    subj, pred, obj = next(
+        iter(rdf_db.graph.triples((None, None, Literal("Hypertension Overview"))))
+    )
+    rdf_db.graph.remove((subj, pred, obj))
+    rdf_db.graph.add((subj, pred, Literal("Hypertension Summary")))
+
+    updated = _execute_query(rdf_db, query)
+    assert updated is not first
+    assert [str(row.title) for row in updated] == ["Hypertension Summary"]
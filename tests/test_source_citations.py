@@ -1,7 +1,14 @@
+import threading
+
+import pytest
+import spacy
 from redis import Redis
 
-from common.get_source import get_triple_source
-from pipeline_01_processing.pipeline import run_pipeline
+from common.get_source import get_source_text, get_triple_source
+from common.tokenize import UNUSED_PIPES, tokenize_text
+from database.rdf.tripleset import TripleSet
+from database.redis.redis import source_key
+from pipeline_01_processing.pipeline import run_pipeline, run_pipeline_batch
 
 
 def test_correct_node_source(db: Redis):
@@ -23,7 +30,7 @@ def test_correct_node_source(db: Redis):
     assert bp.object.loc == (source_id, 4, 6)
 
     # Check text is saved to db
-    res = db.get("source:" + source_id)
+    res = db.get(source_key(source_id))
     assert res is not None
     assert str(res) == source_text
 
@@ -33,3 +40,72 @@ def test_correct_node_source(db: Redis):
         triple_source
         == "High blood pressure is a common condition that affects the body's arteries."
     )
+
+
+@pytest.mark.parametrize("n_process", [1, 2])
+def test_batch_pipeline_saves_sources_in_input_order(db: Redis, n_process: int):
+    """Staged batch runs should stream their input and save every source, in input order."""
+
+    texts = [f"Aspirin number {i} treats pain. It is also called drug {i}." for i in range(5)]
+
+    results = list(run_pipeline_batch(iter(texts), batch_size=2, n_process=n_process))
+
+    assert len(results) == len(texts)
+    for text, (_, source_id) in zip(texts, results, strict=True):
+        assert db.get(source_key(source_id)) == text
+
+
+def test_sentence_index_citations_match_reparsed_source(db: Redis):
+    """Citations cut out with the stored sentence bounds should match a re-parse of the text."""
+
+    source_text = (
+        "High blood pressure is a common condition that affects the body's arteries. "
+        "It's also called hypertension. Left untreated, it can lead to heart disease."
+    )
+    _, source_id = run_pipeline(source_text)
+    sents_key = f"{source_key(source_id)}:sents"
+    assert db.exists(sents_key)
+
+    first, second, _ = tokenize_text(source_text, disable=UNUSED_PIPES).sents
+    cases = [
+        (first.start, first.start + 2, 0, 0),
+        (first.start + 1, first.end - 1, 0, 1),
+        (second.start, second.end - 1, 1, 0),
+    ]
+    indexed = [get_source_text(source_id, *case) for case in cases]
+
+    db.delete(sents_key)
+    reparsed = [get_source_text(source_id, *case) for case in cases]
+
+    assert indexed == reparsed
+    assert indexed[1] == first.text + " " + second.text
+
+
+@pytest.mark.parametrize("failing_stage", ["parse", "build"])
+def test_batch_pipeline_stage_error_reaches_caller(monkeypatch, failing_stage: str):
+    """A stage's error should surface in the caller and leave no stage thread running."""
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+
+    def parse(items, **kwargs):
+        for i, (doc, context) in enumerate(nlp.pipe(items, as_tuples=True)):
+            if failing_stage == "parse" and i == 10:
+                raise RuntimeError("parse failed")
+            yield doc, context
+
+    def build(tokens, source_id):
+        if failing_stage == "build" and tokens.text.startswith("Text 10."):
+            raise RuntimeError("build failed")
+        return TripleSet([])
+
+    monkeypatch.setattr("pipeline_01_processing.pipeline.tokenize_text", parse)
+    monkeypatch.setattr("pipeline_01_processing.pipeline.tokens_to_rdf", build)
+
+    # Far more texts than the hand-off queues hold, so the stages are blocked mid-run
+    texts = (f"Text {i}. Aspirin treats pain." for i in range(200))
+    with pytest.raises(RuntimeError, match=f"{failing_stage} failed"):
+        list(run_pipeline_batch(texts, batch_size=2))
+
+    stages = [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+    assert stages == []
@@ -0,0 +1,51 @@
+from database.redis.redis import SOURCE_COMPRESS_MIN, decode_source, encode_source
+
+
+def as_stored(value: str | bytes) -> bytes:
+    """Bytes redis hands back (with `decode_responses=False`) for a stored value."""
+
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def test_short_source_is_stored_as_plain_text():
+    text = "High blood pressure is a common condition."
+
+    stored = encode_source(text)
+
+    assert stored == text
+    assert decode_source(as_stored(stored)) == text
+
+
+def test_long_source_is_compressed_and_round_trips():
+    text = "High blood pressure is a common condition. " * 100
+    assert len(text.encode("utf-8")) >= SOURCE_COMPRESS_MIN
+
+    stored = encode_source(text)
+
+    assert isinstance(stored, bytes)
+    assert len(stored) < len(text)
+    assert decode_source(stored) == text
+
+
+def test_text_at_the_threshold_round_trips():
+    text = "é" * (SOURCE_COMPRESS_MIN // 2)
+    assert len(text.encode("utf-8")) == SOURCE_COMPRESS_MIN
+
+    assert decode_source(as_stored(encode_source(text))) == text
+    assert decode_source(as_stored(encode_source(text[:-1]))) == text[:-1]
+
+
+def test_legacy_uncompressed_values_are_read_as_is():
+    text = "It's also called hypertension. " * 100
+
+    assert decode_source(text.encode("utf-8")) == text
+    assert decode_source(None) is None
+
+
+def test_short_text_starting_with_the_magic_prefix_round_trips():
+    text = "zlib\x01 looks compressed but is not"
+
+    stored = encode_source(text)
+
+    assert stored != text
+    assert decode_source(as_stored(stored)) == text
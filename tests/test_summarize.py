@@ -0,0 +1,41 @@
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDFS
+
+from database.rdf.indexed_graph import IndexedGraph
+from pipeline_02_retrieval.summarize import summarize_rdf_result
+
+NS = Namespace("http://example.org/node/")
+QUERY = "SELECT ?s ?label WHERE { ?s <http://www.w3.org/2000/01/rdf-schema#label> ?label . }"
+
+
+def query_labels(n: int):
+    graph = IndexedGraph()
+    for i in range(n):
+        graph.add((NS[f"drug{i}"], RDFS.label, Literal(f"aspirin {i}")))
+    return graph.query(QUERY)
+
+
+def test_summary_counts_rows_beyond_those_shown():
+    summary = summarize_rdf_result(query_labels(8))
+
+    assert "Found 8 record(s)." in summary
+    assert "Showing first 5 record(s):" in summary
+    assert "... and 3 more result(s)." in summary
+    assert "Drug: " in summary
+
+
+def test_entity_extraction_reads_only_displayed_rows(monkeypatch):
+    seen = []
+
+    def record_rows(records, variables):
+        seen.append(len(records))
+        return {}
+
+    monkeypatch.setattr("pipeline_02_retrieval.summarize.detect_medical_entities", record_rows)
+
+    summary = summarize_rdf_result(query_labels(8))
+
+    # Extraction is bounded by the head; the remaining rows are only counted
+    assert seen == [5]
+    assert "Found 8 record(s)." in summary
+    assert "... and 3 more result(s)." in summary
@@ -0,0 +1,52 @@
+import spacy
+from spacy.tokens import Doc
+
+from pipeline_02_retrieval.tokens_to_query import (
+    _build_query,
+    clear_query_cache,
+    tokens_to_queries,
+    tokens_to_query,
+)
+
+NLP = spacy.blank("en")
+
+
+def question(drug: str) -> Doc:
+    # Parsed by hand, so noun chunks work without a trained parser
+    return Doc(
+        NLP.vocab,
+        words=["What", "does", drug, "treat", "?"],
+        heads=[3, 3, 3, 3, 3],
+        deps=["dobj", "aux", "nsubj", "ROOT", "punct"],
+        pos=["PRON", "AUX", "PROPN", "VERB", "PUNCT"],
+    )
+
+
+def test_tokens_to_queries_matches_tokens_to_query():
+    docs = [question("Aspirin"), question("Ibuprofen"), question("Aspirin")]
+
+    queries = tokens_to_queries(docs)
+
+    assert queries == [tokens_to_query(doc) for doc in docs]
+    assert 'LCASE("Aspirin")' in queries[0]
+    assert 'LCASE("Ibuprofen")' in queries[1]
+
+
+def test_tokens_to_queries_builds_repeated_questions_once():
+    _build_query.cache_clear()
+
+    tokens_to_queries([question("Aspirin"), question("Aspirin"), question("Aspirin")])
+
+    info = _build_query.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_clear_query_cache_resets_the_cache():
+    tokens_to_query(question("Aspirin"))
+    tokens_to_query(question("Aspirin"))
+    assert _build_query.cache_info().currsize > 0
+
+    clear_query_cache()
+
+    info = _build_query.cache_info()
+    assert (info.currsize, info.hits, info.misses) == (0, 0, 0)
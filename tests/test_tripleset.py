@@ -0,0 +1,49 @@
+from database.rdf.triple import Node, Pred, Triple
+from database.rdf.tripleset import TripleSet
+
+
+def build_tripleset() -> TripleSet:
+    tripleset = TripleSet([])
+    bp = Node("high blood pressure")
+    tripleset.create_triple(bp, Pred("be"), Node("a common condition"))
+    tripleset.create_triple(bp, Pred("call"), Node("hypertension"))
+    tripleset.create_triple(Node("aspirin"), Pred("treat"), Node("pain"))
+    return tripleset
+
+
+def test_indexed_lookups_match_in_insertion_order():
+    tripleset = build_tripleset()
+
+    bp = tripleset.filter(subject="high blood pressure")
+    assert bp.count() == 2
+    assert [t.predicate.value for t in bp] == ["be", "call"]
+    assert bp.get_or_none(predicate="call", object="hypertension") is not None
+    assert bp.filter(predicate="be").count() == 1
+
+    found = tripleset.get_or_none(predicate="call", object="hypertension")
+    assert found is not None and found.subject.value == "high blood pressure"
+    assert tripleset.get_or_none(subject="aspirin", object="hypertension") is None
+
+
+def test_directly_appended_triples_are_found():
+    tripleset = build_tripleset()
+    assert tripleset.get_or_none(subject="ibuprofen") is None
+
+    tripleset.triples.append(Triple(Node("ibuprofen"), Pred("treat"), Node("pain")))
+
+    assert tripleset.filter(object="pain").count() == 2
+    assert tripleset.get_or_none(subject="ibuprofen") is not None
+
+
+def test_filter_view_sees_triples_added_after_filter():
+    tripleset = build_tripleset()
+    pain = tripleset.filter(object="pain")
+    assert pain.count() == 1
+
+    tripleset.triples.append(Triple(Node("ibuprofen"), Pred("treat"), Node("pain")))
+    tripleset.create_triple(Node("heat"), Pred("ease"), Node("pain"))
+
+    # The view is live: it re-reads the parent once the parent has grown
+    assert pain.count() == 3
+    assert pain.filter(predicate="treat").count() == 2
+    assert pain.get_or_none(subject="heat") is not None